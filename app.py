@@ -16,31 +16,99 @@ st.markdown("""
     </script>
 """, unsafe_allow_html=True)
 
+# plotly, streamlit_extras, xgboost e sklearn são importados sob demanda pelas páginas que os usam
+import os
+import time
 import pandas as pd
 from utils.data_prep import *
-import plotly.express as px
 import locale
-from streamlit_extras.metric_cards import style_metric_cards
-import plotly.graph_objects as go
-from models.xgb_model import load_trained_model, predict_idh
+from models.xgb_model import FEATURES, load_trained_model, load_fast_model, predict_idh_batch, predict_idh_fast
+from models.sensitivity import response_curves
+from models.goal_seek import goal_seek
+from models.ensemble import BAND_PERCENTILES, load_ensemble, predict_band
+from models.precompute import load_predictions
+from models.prediction_cache import PredictionCache
 from utils.data_prep import load_and_filter_data, get_municipality_data
+from utils.compact import load_app_dataset_version
+from utils.shared_dataset import attach_or_publish
+from utils.aggregates import load_or_build_aggregates
+from utils.municipality_index import build_index, row_position, state_positions, state_rows
+from utils.formatting import format_number, format_table
+from utils.rankings import SORT_KEYS, load_or_build_rankings, page_positions, ranking_positions
+from utils.scoring import PESOS_PADRAO, build_score_inputs, investment_scores, normalize_weights, top_k
+from utils.correlations import load_or_build_correlations
+from utils.diagnostics import DIAGNOSTIC_TABLES, diagnostic_tables
+from utils.peers import load_or_build_peers, nearest_peers
+from utils.figures import CHARTS, figure_spec, warm_all
+from utils.profiling import SectionTimer, configure_logging, export_metrics, maybe_log_metrics, percentiles, record, reset
+
+# Tempos por seção de cada execução do script (janela móvel por processo)
+inicio_execucao = time.perf_counter()
+secoes = SectionTimer('app')
+
+# Painel de desempenho na barra lateral: só com IDH_DEBUG=1 no ambiente do servidor (as métricas e o botão
+# de zerá-las valem para o processo inteiro, não para a sessão de quem abre o painel)
+DEBUG = os.environ.get('IDH_DEBUG') == '1'
+
+# Dataset único por processo, compartilhado pelas sessões (cache_data devolveria uma cópia a cada execução).
+# Modo compacto (float32/int32 onde a precisão permite, categorias, faixa de IDH como código) salvo com IDH_COMPACT=0
+COMPACT = os.environ.get('IDH_COMPACT', '1') != '0'
+
+# Memória compartilhada entre réplicas (IDH_SHARED_DIR=/dev/shm/idh-expert): dataset, agregados, rankings,
+# previsões e árvores do modelo publicados uma vez e mapeados sem cópia por todos os processos
+SHARED_DIR = os.environ.get('IDH_SHARED_DIR')
+
+@st.cache_resource
+def load_shared():
+    return attach_or_publish(SHARED_DIR, 'df_exported.csv', COMPACT) if SHARED_DIR else None
+
+# Dataset e hash do CSV de onde ele veio, fixados juntos uma vez por processo: todos os artefatos em disco
+# (previsões, correlações, figuras, tabelas) usam este hash, mesmo que o CSV seja trocado depois
+@st.cache_resource
+def load_versioned_data():
+    shared = load_shared()
+    if shared:
+        return shared['df'], shared['data_hash']
+    return load_app_dataset_version('df_exported.csv', COMPACT)
 
-@st.cache_data
 def load_data():
-    return pd.read_csv('df_exported.csv')
+    return load_versioned_data()[0]
+
+def data_version():
+    return load_versioned_data()[1]
 
 @st.cache_resource
 def prepare_model():
     model, scaler, features = load_trained_model()
     return model, scaler, features
 
-# Carregar dados e modelo com indicadores de progresso
+# Árvores do modelo em arrays NumPy para as previsões interativas do simulador
+@st.cache_resource
+def prepare_fast_model():
+    shared = load_shared()
+    return shared['forest'] if shared else load_fast_model()
+
+# Modelo principal e boosters dos percentis 5 e 95 (models/quantis_6vars) empilhados numa única floresta,
+# avaliados em uma só travessia; None quando os quantis não foram treinados para este modelo
+@st.cache_resource
+def prepare_ensemble():
+    shared = load_shared()
+    if shared and shared['ensemble'] is not None:
+        return shared['ensemble']
+    return load_ensemble(prepare_fast_model())
+
+# Scaler do simulador: do segmento compartilhado, sem carregar o Booster, quando disponível
+@st.cache_resource
+def prepare_scaler():
+    shared = load_shared()
+    return shared['scaler'] if shared else prepare_model()[1]
+
+# Carregar dados com indicador de progresso (o modelo só é carregado na página de detalhes)
 with st.spinner('Carregando dados...'):
     df = load_data()
-    df_filtered = df[df['População residente'] <= 100000].copy()
-    
-with st.spinner('Preparando modelo...'):
-    model, scaler, features = prepare_model()
+secoes.mark('dados')
+
+features = FEATURES
 
 # Inicialização do session state
 if 'page' not in st.session_state:
@@ -52,16 +120,66 @@ if 'scroll_to_top' not in st.session_state:
 if 'selected_municipality' not in st.session_state:
     st.session_state.selected_municipality = None
 
-# Função para classificar IDH
-def classificar_idh(valor):
-    if valor < 0.500:
-        return "IDH Baixo"
-    elif valor < 0.800:
-        return "IDH Médio"
-    elif valor < 0.900:
-        return "IDH Alto"
-    else:
-        return "IDH Muito Alto"
+# Sliders do simulador por feature: chave no Session State, rótulo, limites e passo
+# (max None = maior valor observado nos municípios até 100 mil habitantes; os limites se alargam
+# para incluir o valor do município exibido, que pode ser uma capital fora dessa faixa)
+SIMULADOR = {
+    '% de pobres': {'chave': 'pobres', 'rotulo': '% de pobres', 'min': 0.0, 'max': 100.0, 'passo': 0.1},
+    'Ativos com Alto Nível Educacional': {'chave': 'alto_nivel', 'rotulo': 'Ativos com Alto Nível Educacional (%)', 'min': 0.0, 'max': 50.0, 'passo': 0.1},
+    'Produtividade': {'chave': 'produtividade', 'rotulo': 'Produtividade (R$)', 'min': 0.0, 'max': None, 'passo': 100.0},
+    'Médicos por milhares de habitantes': {'chave': 'medicos', 'rotulo': 'Médicos por milhares de habitantes', 'min': 0.0, 'max': None, 'passo': 0.001},
+    'Média Salarial': {'chave': 'media_salarial', 'rotulo': 'Média Salarial (R$)', 'min': 500.0, 'max': 5000.0, 'passo': 50.0},
+    'PIB Municipal': {'chave': 'pib', 'rotulo': 'PIB Municipal (R$)', 'min': 0.0, 'max': None, 'passo': 1000.0}
+}
+
+@st.cache_resource
+def load_simulator_maxima():
+    ate_100k = df['População residente'].to_numpy() <= 100000
+    return {feature: float(df[feature].to_numpy()[ate_100k].max()) for feature in features}
+
+def limites_simulador(feature, valor):
+    config = SIMULADOR[feature]
+    maximo = config['max'] if config['max'] is not None else load_simulator_maxima()[feature]
+    return min(config['min'], valor), max(maximo, valor)
+
+# Cache de previsões do simulador, compartilhado por todas as sessões do processo
+@st.cache_resource
+def load_prediction_cache():
+    return PredictionCache([SIMULADOR[feature]['passo'] for feature in features])
+
+# Curvas de resposta do município: todas as features em uma única previsão em lote
+@st.cache_data(max_entries=512)
+def load_response_curves(municipality):
+    mun = get_municipality_data(df, index, municipality)
+    model, scaler, _ = prepare_model()
+    return response_curves(
+        lambda matriz: predict_idh_batch(model, scaler, features, matriz),
+        features,
+        [float(mun[feature]) for feature in features],
+        [limites_simulador(feature, float(mun[feature])) for feature in features]
+    )
+
+# Colunas exibidas nas tabelas de ranking
+RANKING_COLUNAS = ['estado', 'nomeLocalidade', 'IDH', 'População residente', '% de pobres', 'Produtividade', 'PIB Municipal']
+
+# Página do ranking já formatada em pt-BR: fatia das posições pré-ordenadas, sem reordenar a cada rerun
+@st.cache_data(max_entries=1024)
+def load_ranking_page(estado, coluna, ascendente, pagina, items_por_pagina):
+    posicoes = page_positions(ranking_positions(load_rankings(), coluna, estado), pagina, items_por_pagina, ascendente)
+    return format_table(df.iloc[posicoes][RANKING_COLUNAS])
+
+# Menor mudança nos indicadores do simulador que leva o IDH previsto à meta (busca em lote no modelo)
+@st.cache_data(max_entries=256)
+def load_goal_seek(municipality, meta):
+    mun = get_municipality_data(df, index, municipality)
+    model, scaler, _ = prepare_model()
+    return goal_seek(
+        lambda matriz: predict_idh_batch(model, scaler, features, matriz),
+        [float(mun[feature]) for feature in features],
+        [limites_simulador(feature, float(mun[feature])) for feature in features],
+        meta,
+        [SIMULADOR[feature]['passo'] for feature in features]
+    )
 
 try:
     locale.setlocale(locale.LC_ALL, 'pt_BR.UTF-8')
@@ -71,18 +189,220 @@ except:
     except:
         locale.setlocale(locale.LC_ALL, '')
 
-# Carregar os dados
-@st.cache_data
-def load_data():
-    df = pd.read_csv('df_exported.csv')
-    df['classificacao_idh'] = df['IDH'].apply(classificar_idh)
-    return df
+# Estatísticas nacionais e por estado, persistidas por hash do dataset (e modo compacto ou não)
+@st.cache_resource
+def load_aggregates():
+    shared = load_shared()
+    return shared['aggregates'] if shared else load_or_build_aggregates(load_data(), data_version(), 'compacto' if COMPACT else 'completo')
+
+# IDH previsto e resíduo (real - previsto) de todos os municípios, lidos do cache em disco
+@st.cache_resource
+def load_model_predictions():
+    shared = load_shared()
+    return shared['predictions'] if shared else load_predictions(load_data(), data_version())
+
+# Correlações de Spearman com o IDH, persistidas por hash do dataset
+@st.cache_resource
+def load_correlations():
+    df = load_data()
+    return load_or_build_correlations(df[df['População residente'] <= 100000], data_version(), scope='ate100k')
+
+# Arrays de entrada do score de potencial de investimento (país inteiro)
+@st.cache_resource
+def load_score_inputs():
+    return build_score_inputs(load_data())
+
+# Posições pré-ordenadas por IDH, população, pobreza, produtividade e PIB (nacional e por estado),
+# persistidas por hash do dataset
+@st.cache_resource
+def load_rankings():
+    shared = load_shared()
+    return shared['rankings'] if shared else load_or_build_rankings(load_data(), data_version())
+
+# Índice de vizinhos (KD-tree) sobre os indicadores padronizados, persistido por hash do dataset
+@st.cache_resource
+def load_peers():
+    return load_or_build_peers(load_data(), data_version())
+
+# Índice (estado, município) -> posição e fatias por estado
+@st.cache_resource
+def load_index():
+    return build_index(load_data())
 
-df = load_data()
+# Figuras dos gráficos das páginas inicial e por estado: especificação JSON em disco por (gráfico, estado,
+# hash do dataset) e um único go.Figure por processo, já validado (o st.plotly_chart só serializa)
+@st.cache_resource
+def load_figure(chart, estado=None):
+    import plotly.io as pio
+
+    rows = state_rows(load_data(), load_index(), estado) if estado is not None else load_data()
+    return pio.from_json(figure_spec(data_version(), chart, rows, estado))
+
+# Pré-carregamento opcional de todas as figuras na subida do processo (IDH_WARM_FIGURES=1)
+@st.cache_resource
+def warm_figures():
+    warm_all(load_data(), load_index(), data_version())
+    for chart, (_, por_estado) in CHARTS.items():
+        for estado in (load_index()['states'] if por_estado else [None]):
+            load_figure(chart, estado)
+
+index = load_index()
+if os.environ.get('IDH_WARM_FIGURES') == '1':
+    warm_figures()
+secoes.mark('preparo')
+
+# Simulador isolado em um fragmento: mexer nos sliders reexecuta só esta função,
+# sem recalcular os cards, as tabelas de diagnóstico e as recomendações da página
+@st.fragment
+def simulador(municipality, mun_data):
+    secoes_simulador = SectionTimer('simulador')
+
+    # Função de callback para o reset
+    def reset_values():
+        # Atualizar diretamente os valores no Session State
+        for feature, config in SIMULADOR.items():
+            st.session_state[config['chave']] = float(mun_data[feature])
+
+    # Título da seção
+    st.markdown("<p style='font-size: 1.1rem; font-weight: bold;'>Simulador de Impacto por Indicador Relevante</p>", unsafe_allow_html=True)
+
+    # Estado próprio do simulador: os sliders voltam aos valores do município quando ele muda
+    # (ou quando o Streamlit descartou o estado dos widgets ao sair da página)
+    chaves_ausentes = any(config['chave'] not in st.session_state for config in SIMULADOR.values())
+    if chaves_ausentes or st.session_state.get('simulador_municipio') != municipality:
+        reset_values()
+        st.session_state.meta_idh = min(1.0, round(float(mun_data['IDH']) + 0.05, 3))
+        st.session_state.simulador_municipio = municipality
+
+    # Criar colunas com espaçamento aumentado
+    col1, col2 = st.columns([1, 1], gap="large")
+
+    with col1:
+        st.markdown("<p style='font-weight: bold; margin-bottom: 20px;'>Ajuste os Indicadores:</p>", unsafe_allow_html=True)
+        
+        # Sliders para ajuste (sem value, usando apenas Session State)
+        for feature, config in SIMULADOR.items():
+            minimo, maximo = limites_simulador(feature, float(mun_data[feature]))
+            st.slider(
+                config['rotulo'],
+                min_value=minimo,
+                max_value=maximo,
+                key=config['chave'],
+                step=config['passo']
+            )
+
+        # Botão de reset após os sliders
+        st.button("Resetar Valores", on_click=reset_values)
+    secoes_simulador.mark('sliders')
+
+    with col2:
+        st.markdown("<p style='font-weight: bold; margin-bottom: 20px;'>Impacto Estimado no IDH:</p>", unsafe_allow_html=True)
+        
+        # Preparar dados para previsão (na ordem de features)
+        input_data = [st.session_state[SIMULADOR[feature]['chave']] for feature in features]
+
+        # Fazer previsão pelo caminho rápido, reaproveitando posições de slider já calculadas;
+        # com o conjunto treinado, a mesma travessia devolve também a faixa de incerteza
+        scaler = prepare_scaler()
+        forest = prepare_fast_model()
+        conjunto = prepare_ensemble()
+
+        def prever(valores):
+            if conjunto is None:
+                return float(predict_idh_fast(forest, scaler, features, valores)[0]), None, None
+            previsto, inferior, superior = predict_band(conjunto, scaler, features, valores)
+            return float(previsto[0]), float(inferior[0]), float(superior[0])
+
+        idh_previsto, faixa_inferior, faixa_superior = load_prediction_cache().get_or_compute(input_data, prever)
+        secoes_simulador.mark('previsao')
+        
+        # Mostrar IDH Atual
+        col2.metric(
+            "IDH Atual",
+            f"{mun_data['IDH']:.3f}"
+        )
+        
+        # Calcular diferença
+        diferenca = idh_previsto - mun_data['IDH']
+        
+        # Verificar se houve alteração nos valores originais
+        valores_alterados = any(
+            st.session_state[config['chave']] != float(mun_data[feature])
+            for feature, config in SIMULADOR.items()
+        )
+        
+        # Mostrar IDH Previsto
+        if valores_alterados:
+            col2.metric(
+                "IDH Previsto",
+                f"{idh_previsto:.3f}",
+                f"{diferenca:+.3f}"
+            )
+            if faixa_inferior is not None:
+                col2.caption(
+                    f"Faixa de incerteza (percentis {BAND_PERCENTILES[0]} a {BAND_PERCENTILES[1]} do IDH por regressão quantílica): "
+                    f"{faixa_inferior:.3f} a {faixa_superior:.3f}"
+                )
+        else:
+            col2.metric(
+                "IDH Previsto",
+                f"{mun_data['IDH']:.3f}",
+                None
+            )
+    secoes_simulador.mark('metricas')
+
+    # Meta de IDH: busca inversa das menores mudanças nos indicadores, dentro dos limites dos sliders
+    st.markdown("<p style='font-weight: bold; margin: 30px 0 10px 0;'>Meta de IDH: menores mudanças necessárias</p>", unsafe_allow_html=True)
+
+    def aplicar_meta(valores):
+        for feature, valor in zip(features, valores):
+            st.session_state[SIMULADOR[feature]['chave']] = float(valor)
+
+    col_meta, col_buscar = st.columns([0.3, 0.7], vertical_alignment="bottom")
+    with col_meta:
+        meta = st.number_input("IDH desejado (previsto pelo modelo)", min_value=0.0, max_value=1.0, step=0.005, format="%.3f", key="meta_idh")
+    with col_buscar:
+        if st.button("Buscar mudanças mínimas"):
+            st.session_state.meta_busca = (municipality, meta)
+
+    if st.session_state.get('meta_busca') == (municipality, meta):
+        with st.spinner('Buscando...'):
+            resultado = load_goal_seek(municipality, meta)
+        atuais = [float(mun_data[feature]) for feature in features]
+        alteradas = [i for i, feature in enumerate(features) if resultado['valores'][i] != atuais[i]]
+
+        if not resultado['alcancado']:
+            st.warning(f"Meta fora do alcance dentro dos limites do simulador. Maior IDH previsto encontrado: {resultado['idh']:.3f}")
+        elif not alteradas:
+            st.info("O IDH previsto com os valores atuais já atinge a meta.")
+
+        if alteradas:
+            st.dataframe(
+                pd.DataFrame({
+                    'Indicador': [SIMULADOR[features[i]]['rotulo'] for i in alteradas],
+                    'Atual': [atuais[i] for i in alteradas],
+                    'Necessário': [resultado['valores'][i] for i in alteradas],
+                    'Variação': [resultado['valores'][i] - atuais[i] for i in alteradas]
+                }),
+                column_config={
+                    "Atual": st.column_config.NumberColumn(format="%.3f"),
+                    "Necessário": st.column_config.NumberColumn(format="%.3f"),
+                    "Variação": st.column_config.NumberColumn(format="%+.3f")
+                },
+                hide_index=True,
+                use_container_width=True
+            )
+            st.caption(f"IDH previsto com as mudanças: {resultado['idh']:.3f}. {format_number(resultado['avaliacoes'], 0)} cenários avaliados em {resultado['tempo']:.2f}s")
+            st.button("Aplicar no simulador", on_click=aplicar_meta, args=(resultado['valores'],))
+    secoes_simulador.mark('meta')
 
 # Lógica de navegação entre páginas
 if st.session_state.page == 'home':
     # Página inicial
+    from streamlit_extras.metric_cards import style_metric_cards
+
+    secoes = SectionTimer('home')
+
     st.title('IDH Expert')
     st.write('Explore dados e obtenha insights para aumentar o IDH dos municípios brasileiros.')
 
@@ -93,20 +413,8 @@ if st.session_state.page == 'home':
     with col_graficos:
         st.markdown("### IDH Médio por Estado")
         
-        # Gráfico de IDH por Estado (ordenado do menor para o maior)
-        df_estado = df.groupby('estado')['IDH'].mean().sort_values().reset_index()
-        fig_estado = px.bar(df_estado, 
-                        x='estado', 
-                        y='IDH',
-                        color='IDH',
-                        color_continuous_scale='RdYlBu')
-        
-        fig_estado.update_layout(
-            xaxis_title="Estado",
-            yaxis_title="IDH Médio",
-            showlegend=False
-        )
-        st.plotly_chart(fig_estado, use_container_width=True)
+        st.plotly_chart(load_figure('idh_por_estado'), use_container_width=True)
+    secoes.mark('grafico')
 
     # Coluna da direita (métricas)
     with col_metricas:
@@ -128,14 +436,15 @@ if st.session_state.page == 'home':
         
         # Métricas formatadas
         st.metric("📊 IDH Médio", f"{df['IDH'].mean():.3f}")
-        st.metric("👥 População Total", f"{df['População residente'].sum():,.0f}".replace(',', '.'))
+        st.metric("👥 População Total", format_number(df['População residente'].sum(), 0))
         st.metric("💰 % de Pobres", f"{df['% de pobres'].mean():.1f}%")
-        st.metric("📈 Produtividade Média", f"R$ {df['Produtividade'].mean():,.2f}".replace(',', '.'))
+        st.metric("📈 Produtividade Média", format_number(df['Produtividade'].mean(), 2, prefix='R$ '))
         
         st.write("")
         st.write("")
 
     style_metric_cards()
+    secoes.mark('metricas')
 
     if st.button("🏠 Filtrar por Estado", key="filtrar_por_estado", use_container_width=True):
         st.session_state.page = "filter_state"
@@ -151,6 +460,8 @@ if st.session_state.page == 'home':
 
 # INÍCIO DA VISUALIZAÇÃO POR ESTADO
 elif st.session_state.page == 'filter_state':
+    secoes = SectionTimer('filter_state')
+
     st.title("Análise por Estado")
     
     estado_selecionado = st.selectbox(
@@ -159,51 +470,39 @@ elif st.session_state.page == 'filter_state':
     )
     
     if estado_selecionado:
-        df_estado = df[df['estado'] == estado_selecionado].copy()
+        df_estado = state_rows(df, index, estado_selecionado)
         
         col_graf, col_metricas = st.columns([0.7, 0.3], gap="large")
         
         with col_graf:
-            df_estado['faixa_idh'] = df_estado['IDH'].apply(classificar_idh)
-            df_contagem = df_estado['faixa_idh'].value_counts().reset_index()
-            df_contagem.columns = ['Faixa', 'Quantidade']
-
-            fig_dist = px.bar(df_contagem, 
-                            x='Faixa', 
-                            y='Quantidade',
-                            title='Distribuição dos Municípios por Faixa de IDH',
-                            color='Faixa',
-                            color_discrete_map={
-                                'IDH Muito Alto': '#1a9850',
-                                'IDH Alto': '#91cf60',
-                                'IDH Médio': '#fc8d59',
-                                'IDH Baixo': '#d73027'
-                            })
-            
-            fig_dist.update_layout(
-                showlegend=False,
-                xaxis_title="Faixa",
-                yaxis_title="Quantidade de Municípios"
-            )
-            st.plotly_chart(fig_dist, use_container_width=True)
+            st.plotly_chart(load_figure('distribuicao_idh', estado_selecionado), use_container_width=True)
         
         with col_metricas:
             st.markdown("### Indicadores do Estado")
             
             st.metric("Total de Municípios", len(df_estado))
-            st.metric("População Total", f"{df_estado['População residente'].sum():,.0f}")
+            st.metric("População Total", format_number(df_estado['População residente'].sum(), 0))
             st.metric("IDH Médio", f"{df_estado['IDH'].mean():.3f}")
             st.metric("% de Pobres", f"{df_estado['% de pobres'].mean():.1f}%")
             
             st.write("")
             st.write("")
+        secoes.mark('grafico_metricas')
             
-        st.subheader("Ranking dos Municípios por IDH")
-
-        df_ranking = df_estado[['estado', 'nomeLocalidade', 'IDH', 'População residente', '% de pobres', 'Produtividade', 'PIB Municipal']].sort_values('IDH', ascending=False)
-
-        items_por_pagina = 10
-        total_items = len(df_ranking)
+        st.subheader("Ranking dos Municípios")
+
+        col_ordem, col_sentido, col_escopo_rank, col_itens = st.columns([0.3, 0.25, 0.25, 0.2])
+        with col_ordem:
+            ordenar_por = st.selectbox("Ordenar por", list(SORT_KEYS), key="ranking_ordem")
+        with col_sentido:
+            sentido = st.radio("Ordem", ["Decrescente", "Crescente"], horizontal=True, key="ranking_sentido")
+        with col_escopo_rank:
+            escopo_ranking = st.radio("Abrangência", ["Estado", "Nacional"], horizontal=True, key="ranking_escopo")
+        with col_itens:
+            items_por_pagina = st.selectbox("Itens por página", [10, 25, 50, 100], key="ranking_itens")
+
+        estado_ranking = estado_selecionado if escopo_ranking == "Estado" else None
+        total_items = len(ranking_positions(load_rankings(), SORT_KEYS[ordenar_por], estado_ranking))
         total_paginas = (total_items + items_por_pagina - 1) // items_por_pagina
 
         pagina = st.number_input('Página', min_value=1, max_value=total_paginas, value=1) - 1
@@ -211,13 +510,7 @@ elif st.session_state.page == 'filter_state':
         inicio = pagina * items_por_pagina
         fim = min(inicio + items_por_pagina, total_items)
 
-        df_pagina = df_ranking.iloc[inicio:fim].copy()
-
-        df_pagina['População residente'] = df_pagina['População residente'].map('{:,.0f}'.format).str.replace('.', '*').str.replace(',', '.').str.replace('*', ',')
-        df_pagina['% de pobres'] = df_pagina['% de pobres'].map('{:.1f}'.format).str.replace('.', ',') + '%'
-        df_pagina['Produtividade'] = df_pagina['Produtividade'].map('R$ {:,.2f}'.format).str.replace('.', '*').str.replace(',', '.').str.replace('*', ',')
-        df_pagina['PIB Municipal'] = df_pagina['PIB Municipal'].map('R$ {:,.2f}'.format).str.replace('.', '*').str.replace(',', '.').str.replace('*', ',')
-        df_pagina['IDH'] = df_pagina['IDH'].map('{:.3f}'.format).str.replace('.', ',')
+        df_pagina = load_ranking_page(estado_ranking, SORT_KEYS[ordenar_por], sentido == "Crescente", pagina, items_por_pagina)
 
         st.dataframe(
             df_pagina.set_index('estado').rename(columns={
@@ -243,40 +536,56 @@ elif st.session_state.page == 'filter_state':
             - **PIB Municipal**: Valor calculado seguindo metodologia do IBGE alinhada às recomendações das Nações Unidas
         """)
 
+        secoes.mark('ranking')
+
         st.markdown("---")
-        st.subheader("Municípios com Maior Potencial de Investimento")
+        st.subheader("IDH Real vs. Previsto pelo Modelo")
 
-        def calcular_score_potencial(row, pop_max):
-            idh_norm = 1 - row['IDH']
-            pobres_norm = 1 - (row['% de pobres'] / 100)
-            pop_norm = 1 - (row['População residente'] / pop_max)
-            
-            peso_idh = 0.5
-            peso_pobres = 0.3
-            peso_pop = 0.2
-            
-            return (idh_norm * peso_idh) + (pobres_norm * peso_pobres) + (pop_norm * peso_pop)
+        df_residuos = df_estado[['estado', 'nomeLocalidade', 'IDH']].join(
+            state_rows(load_model_predictions(), index, estado_selecionado)
+        ).rename(columns={'nomeLocalidade': 'Município', 'IDH': 'IDH Real'}).set_index('estado')
 
-        df_potencial = df_estado.copy()
-        pop_max = df_potencial['População residente'].max()
-        df_potencial['score'] = df_potencial.apply(lambda x: calcular_score_potencial(x, pop_max), axis=1)
-        df_top10 = df_potencial.nlargest(10, 'score')[['estado', 'nomeLocalidade', 'IDH', 'População residente', '% de pobres', 'Produtividade', 'PIB Municipal']]
+        residuos_config = {
+            "IDH Real": st.column_config.NumberColumn(format="%.3f"),
+            "IDH Previsto": st.column_config.NumberColumn(format="%.3f"),
+            "Resíduo": st.column_config.NumberColumn(format="%+.3f")
+        }
+        col_acima, col_abaixo = st.columns(2, gap="large")
+        with col_acima:
+            st.markdown("**Acima do esperado pelo modelo**")
+            st.dataframe(df_residuos.nlargest(5, 'Resíduo'), column_config=residuos_config, use_container_width=True)
+        with col_abaixo:
+            st.markdown("**Abaixo do esperado pelo modelo**")
+            st.dataframe(df_residuos.nsmallest(5, 'Resíduo'), column_config=residuos_config, use_container_width=True)
+        secoes.mark('residuos')
+
+        st.markdown("---")
+        st.subheader("Municípios com Maior Potencial de Investimento")
+
+        col_escopo, col_pesos = st.columns([0.3, 0.7], gap="large")
+        with col_escopo:
+            escopo = st.radio("Abrangência do ranking", ["Estado", "Nacional"], horizontal=True, key="escopo_potencial")
+        with col_pesos:
+            with st.expander("Ajustar pesos dos critérios"):
+                peso_idh = st.slider("Peso: IDH mais baixo", 0.0, 1.0, PESOS_PADRAO['idh'], 0.05, key="peso_idh")
+                peso_pobres = st.slider("Peso: menor percentual de pobres", 0.0, 1.0, PESOS_PADRAO['pobres'], 0.05, key="peso_pobres")
+                peso_pop = st.slider("Peso: menor população", 0.0, 1.0, PESOS_PADRAO['populacao'], 0.05, key="peso_pop")
+        pesos = normalize_weights({'idh': peso_idh, 'pobres': peso_pobres, 'populacao': peso_pop})
 
-        df_top10 = df_top10.rename(columns={'nomeLocalidade': 'Município'})
+        # Score do país inteiro em uma passada vetorizada; top 10 por seleção parcial
+        scores = investment_scores(load_score_inputs(), pesos, escopo='estado' if escopo == "Estado" else 'nacional')
+        posicoes = state_positions(index, estado_selecionado) if escopo == "Estado" else None
+        df_top10 = df.iloc[top_k(scores, 10, posicoes)][RANKING_COLUNAS]
 
-        df_top10['População residente'] = df_top10['População residente'].map('{:,.0f}'.format).str.replace(',', '.')
-        df_top10['% de pobres'] = df_top10['% de pobres'].map('{:.1f}%'.format)
-        df_top10['Produtividade'] = df_top10['Produtividade'].map('R$ {:,.2f}'.format).str.replace('.', '*').str.replace(',', '.').str.replace('*', ',')
-        df_top10['PIB Municipal'] = df_top10['PIB Municipal'].map('R$ {:,.2f}'.format).str.replace('.', '*').str.replace(',', '.').str.replace('*', ',')
-        df_top10['IDH'] = df_top10['IDH'].map('{:.3f}'.format)
+        df_top10 = format_table(df_top10.rename(columns={'nomeLocalidade': 'Município'}))
 
         st.write("Top 10 municípios com maior potencial de melhoria do IDH através de investimentos:")
 
-        st.markdown("""
+        st.markdown(f"""
         **Critérios de seleção:**
-        - IDH mais baixo (50% do peso)
-        - Menor percentual de pobres (30% do peso)
-        - Menor população (20% do peso)
+        - IDH mais baixo ({pesos['idh']:.0%} do peso)
+        - Menor percentual de pobres ({pesos['pobres']:.0%} do peso)
+        - Menor população ({pesos['populacao']:.0%} do peso)
         """)
 
         st.dataframe(
@@ -293,11 +602,12 @@ elif st.session_state.page == 'filter_state':
             hide_index=False,
             use_container_width=True
         )
+        secoes.mark('potencial')
 
         for idx, row in df_top10.iterrows():
             if st.button(f"Ver detalhes - {row['Município']}", key=f"btn_{idx}"):
                 st.session_state.page = 'municipality_detail'
-                st.session_state.selected_municipality = row['Município']
+                st.session_state.selected_municipality = (row['estado'], row['Município'])
                 st.markdown('<script>forceScrollToTop();</script>', unsafe_allow_html=True)
                 st.rerun()
 
@@ -314,13 +624,18 @@ elif st.session_state.page == 'municipality_detail':
     st.markdown('<div style="position: absolute; top: 0;"></div>', unsafe_allow_html=True)
     st.markdown('<script>forceScrollToTop();</script>', unsafe_allow_html=True)
 
+    secoes = SectionTimer('municipality_detail')
+
     st.title("Análise Detalhada do Município")
     
     if st.session_state.selected_municipality:
-        municipio = st.session_state.selected_municipality
-        df_mun = df[df['nomeLocalidade'] == municipio].iloc[0]
-        df_estado = df[df['estado'] == df_mun['estado']]
-        media_nacional = df['IDH'].mean()
+        estado_mun, municipio = st.session_state.selected_municipality
+        df_mun = get_municipality_data(df, index, st.session_state.selected_municipality)
+        agg = load_aggregates()
+        media_nac = agg['nacional']['mean']
+        media_est = agg['estados'][estado_mun]['mean']
+        soma_est = agg['estados'][estado_mun]['sum']
+        media_nacional = media_nac['IDH']
         
         # Botão de voltar
         if st.button("← Voltar"):
@@ -343,189 +658,66 @@ elif st.session_state.page == 'municipality_detail':
             """, unsafe_allow_html=True)
 
         with col2:
-            pop_percent = (df_mun['População residente']/df_estado['População residente'].sum()*100)
+            pop_percent = (df_mun['População residente']/soma_est['População residente']*100)
             st.markdown(f"""
                 <h3 style='margin: 0; font-size: 1rem; font-weight: 600'>População</h3>
-                <p style='font-size: 2rem; margin: 0'>{format(df_mun['População residente'], ',.0f').replace(',', '.')}</p>
+                <p style='font-size: 2rem; margin: 0'>{format_number(df_mun['População residente'], 0)}</p>
                 <p style='color: gray; margin: 0'>{pop_percent:.1f}% do estado</p>
             """, unsafe_allow_html=True)
 
         with col3:
-            pobres_diff = df_mun['% de pobres'] - df_estado['% de pobres'].mean()
+            pobres_diff = df_mun['% de pobres'] - media_est['% de pobres']
             color = "red" if pobres_diff > 0 else "gray"
             st.markdown(f"""
                 <h3 style='margin: 0; font-size: 1rem; font-weight: 600'>% de Pobres</h3>
                 <p style='font-size: 2rem; margin: 0'>{df_mun['% de pobres']:.1f}%</p>
-                <p style='color: {color}; margin: 0'>Média estadual: {df_estado['% de pobres'].mean():.1f}%</p>
+                <p style='color: {color}; margin: 0'>Média estadual: {media_est['% de pobres']:.1f}%</p>
             """, unsafe_allow_html=True)
 
         with col4:
-            salario_diff = df_mun['Média Salarial'] - df_estado['Média Salarial'].mean()
+            salario_diff = df_mun['Média Salarial'] - media_est['Média Salarial']
             color = "red" if salario_diff < 0 else "gray"
             st.markdown(f"""
                 <h3 style='margin: 0; font-size: 1rem; font-weight: 600'>Média Salarial</h3>
                 <p style='font-size: 2rem; margin: 0'>R$ {df_mun['Média Salarial']:,.2f}</p>
-                <p style='color: {color}; margin: 0'>Média estadual: R$ {df_estado['Média Salarial'].mean():,.2f}</p>
+                <p style='color: {color}; margin: 0'>Média estadual: R$ {media_est['Média Salarial']:,.2f}</p>
             """, unsafe_allow_html=True)
+        secoes.mark('cards')
 
         st.markdown("---")
 
         # SEÇÃO DE TABELAS DE INDICADORES SOCIOECONOMICOS E INFRAESTRUTURA
         st.markdown("<h3 style='margin: 20px 0; font-size: 1.1rem; font-weight: bold;'>Diagnóstico por Área</h3>", unsafe_allow_html=True)
 
-        # Tabela de Educação
-        st.markdown("<h4 style='margin: 10px 0; font-size: 1rem; font-weight: bold;'>Educação</h4>", unsafe_allow_html=True)
-
-        # Correlações com IDH (Spearman)
-        education_correlations = {
-            'Ativos com Alto Nível Educacional': 0.635790,
-            'Ativos com Médio Nível Educacional': 0.304849,
-            'Ativos com Baixo Nível Educacional': -0.464217
-        }
-
-        # Calcular as diferenças
-        differences = []
-        for indicator in ['Ativos com Alto Nível Educacional', 'Ativos com Médio Nível Educacional', 'Ativos com Baixo Nível Educacional']:
-            local_val = float(df_mun[indicator])
-            national_val = df[indicator].mean()
-            diff = local_val - national_val
-            color = 'red' if diff < 0 else 'green'
-            differences.append(f"<span style='color: {color}'>{'+'if diff > 0 else ''}{diff:.1f}%</span>")
-
-        # Criar o dicionário com todas as colunas
-        education_data = {
-            'Indicador': ['Ativos com Alto Nível Educacional', 'Ativos com Médio Nível Educacional', 'Ativos com Baixo Nível Educacional'],
-            'Índice Local': [f"{df_mun['Ativos com Alto Nível Educacional']:.1f}%", f"{df_mun['Ativos com Médio Nível Educacional']:.1f}%", f"{df_mun['Ativos com Baixo Nível Educacional']:.1f}%"],
-            'Média Estadual': [f"{df_estado['Ativos com Alto Nível Educacional'].mean():.1f}%", f"{df_estado['Ativos com Médio Nível Educacional'].mean():.1f}%", f"{df_estado['Ativos com Baixo Nível Educacional'].mean():.1f}%"],
-            'Média Nacional': [f"{df['Ativos com Alto Nível Educacional'].mean():.1f}%", f"{df['Ativos com Médio Nível Educacional'].mean():.1f}%", f"{df['Ativos com Baixo Nível Educacional'].mean():.1f}%"],
-            'Diferença p/ Média Nacional': differences,
-            'Correlação c/ IDH': [f"{education_correlations['Ativos com Alto Nível Educacional']:.3f}", f"{education_correlations['Ativos com Médio Nível Educacional']:.3f}", f"{education_correlations['Ativos com Baixo Nível Educacional']:.3f}"]
-        }
-
-        # Criar e exibir a tabela
-        df_education = pd.DataFrame(education_data)
-        styled_table = (df_education.style
-            .hide(axis='index')
-            .set_properties(**{'text-align': 'center', 'padding': '8px'})
-            .set_table_styles([
-                {'selector': 'th', 'props': [('text-align', 'center'), ('font-weight', 'bold'), ('background-color', '#f0f2f6'), ('padding', '8px')]},
-                {'selector': 'td', 'props': [('text-align', 'center'), ('padding', '8px')]}
-            ])
-        )
-        st.markdown(styled_table.to_html(), unsafe_allow_html=True)
-
-        # TABELA DE EMPREGO E RENDA (com PIB Municipal)
-        st.markdown("<h4 style='margin: 10px 0; font-size: 1rem; font-weight: bold;'>Emprego e Renda</h4>", unsafe_allow_html=True)
-
-        # Correlações com IDH (Spearman)
-        income_correlations = {
-            '% de pobres': -0.833024,
-            'Média Salarial': 0.390501,
-            'Produtividade': 0.612564,
-            'PIB Municipal': 0.337092
-        }
-
-        # Calcular as diferenças
-        income_differences = []
-        for indicator in ['% de pobres', 'Média Salarial', 'Produtividade', 'PIB Municipal']:
-            local_val = float(df_mun[indicator])
-            national_val = df[indicator].mean()
-            diff = local_val - national_val
-            if indicator == '% de pobres':
-                color = 'red' if diff > 0 else 'green'
-                income_differences.append(f"<span style='color: {color}'>{'+'if diff > 0 else ''}{diff:.1f}%</span>")
-            else:
-                color = 'red' if diff < 0 else 'green'
-                income_differences.append(f"<span style='color: {color}'>{'+'if diff > 0 else ''}R$ {diff:,.2f}</span>")
-
-        # Criar o dicionário com todas as colunas
-        income_data = {
-            'Indicador': ['% de pobres', 'Média Salarial', 'Produtividade', 'PIB Municipal'],
-            'Índice Local': [f"{df_mun['% de pobres']:.1f}%", f"R$ {df_mun['Média Salarial']:,.2f}", f"R$ {df_mun['Produtividade']:,.2f}", f"R$ {df_mun['PIB Municipal']:,.2f}"],
-            'Média Estadual': [f"{df_estado['% de pobres'].mean():.1f}%", f"R$ {df_estado['Média Salarial'].mean():,.2f}", f"R$ {df_estado['Produtividade'].mean():,.2f}", f"R$ {df_estado['PIB Municipal'].mean():,.2f}"],
-            'Média Nacional': [f"{df['% de pobres'].mean():.1f}%", f"R$ {df['Média Salarial'].mean():,.2f}", f"R$ {df['Produtividade'].mean():,.2f}", f"R$ {df['PIB Municipal'].mean():,.2f}"],
-            'Diferença p/ Média Nacional': income_differences,
-            'Correlação c/ IDH': [f"{income_correlations['% de pobres']:.3f}", f"{income_correlations['Média Salarial']:.3f}", f"{income_correlations['Produtividade']:.3f}", f"{income_correlations['PIB Municipal']:.3f}"]
-        }
-
-        # Criar e exibir a tabela
-        df_income = pd.DataFrame(income_data)
-        styled_table = (df_income.style
-            .hide(axis='index')
-            .set_properties(**{'text-align': 'center', 'padding': '8px'})
-            .set_table_styles([
-                {'selector': 'th', 'props': [('text-align', 'center'), ('font-weight', 'bold'), ('background-color', '#f0f2f6'), ('padding', '8px')]},
-                {'selector': 'td', 'props': [('text-align', 'center'), ('padding', '8px')]}
-            ])
-        )
-        st.markdown(styled_table.to_html(), unsafe_allow_html=True)
-
-        # TABELA DE INFRAESTRUTURA E RECURSOS DE SAÚDE
-        st.markdown("<h4 style='margin: 10px 0; font-size: 1rem; font-weight: bold;'>Infraestrutura e Recursos de Saúde</h4>", unsafe_allow_html=True)
-
-        # Correlações com IDH (Spearman)
-        health_correlations = {
-            'Taxa de Saneamento Básico': 0.319285,
-            'Médicos por milhares de habitantes': 0.398484,
-            'Hospitais por milhares de habitantes': 0.332249
-        }
-
-        # Calcular as diferenças
-        health_differences = []
-        for indicator in ['Taxa de Saneamento Básico', 'Médicos por milhares de habitantes', 'Hospitais por milhares de habitantes']:
-            local_val = float(df_mun[indicator])
-            national_val = df[indicator].mean()
-            diff = local_val - national_val
-            if indicator == 'Taxa de Saneamento Básico':
-                color = 'red' if diff < 0 else 'green'
-                health_differences.append(f"<span style='color: {color}'>{'+'if diff > 0 else ''}{diff:.1f}%</span>")
-            else:
-                color = 'red' if diff < 0 else 'green'
-                health_differences.append(f"<span style='color: {color}'>{'+'if diff > 0 else ''}{diff:.3f}</span>")
-
-        # Criar o dicionário com todas as colunas
-        health_data = {
-            'Indicador': ['Taxa de Saneamento Básico', 'Médicos por milhares de habitantes', 'Hospitais por milhares de habitantes'],
-            'Índice Local': [f"{df_mun['Taxa de Saneamento Básico']:.1f}%", f"{df_mun['Médicos por milhares de habitantes']:.3f}", f"{df_mun['Hospitais por milhares de habitantes']:.3f}"],
-            'Média Estadual': [f"{df_estado['Taxa de Saneamento Básico'].mean():.1f}%", f"{df_estado['Médicos por milhares de habitantes'].mean():.3f}", f"{df_estado['Hospitais por milhares de habitantes'].mean():.3f}"],
-            'Média Nacional': [f"{df['Taxa de Saneamento Básico'].mean():.1f}%", f"{df['Médicos por milhares de habitantes'].mean():.3f}", f"{df['Hospitais por milhares de habitantes'].mean():.3f}"],
-            'Diferença p/ Média Nacional': health_differences,
-            'Correlação c/ IDH': [f"{health_correlations['Taxa de Saneamento Básico']:.3f}", f"{health_correlations['Médicos por milhares de habitantes']:.3f}", f"{health_correlations['Hospitais por milhares de habitantes']:.3f}"]
-        }
-
-        # Criar e exibir a tabela
-        df_health = pd.DataFrame(health_data)
-        styled_table = (df_health.style
-            .hide(axis='index')
-            .set_properties(**{'text-align': 'center', 'padding': '8px'})
-            .set_table_styles([
-                {'selector': 'th', 'props': [('text-align', 'center'), ('font-weight', 'bold'), ('background-color', '#f0f2f6'), ('padding', '8px')]},
-                {'selector': 'td', 'props': [('text-align', 'center'), ('padding', '8px')]}
-            ])
-        )
-        st.markdown(styled_table.to_html(), unsafe_allow_html=True)
+        # Tabelas já renderizadas em HTML, em cache por (município, hash do dataset); correlações de Spearman
+        # com o IDH dos municípios até 100 mil habitantes, nacionais e do estado
+        tabelas = diagnostic_tables(data_version(), df_mun, agg, load_correlations())
+        for (titulo, _, _), html in zip(DIAGNOSTIC_TABLES, tabelas):
+            st.markdown(f"<h4 style='margin: 10px 0; font-size: 1rem; font-weight: bold;'>{titulo}</h4>", unsafe_allow_html=True)
+            st.markdown(html, unsafe_allow_html=True)
+        secoes.mark('tabelas')
 
         # SEÇÃO DE RECOMENDAÇÕES (mantida como estava)
         st.markdown("<br><hr style='margin: 30px 0; border: 0.5px solid #e6e6e6;'><br>", unsafe_allow_html=True)
         st.markdown("<h3 style='margin: 20px 0; font-size: 1.1rem; font-weight: bold;'>Recomendações por Área</h3>", unsafe_allow_html=True)
 
-        media_alto_estado = df_estado['Ativos com Alto Nível Educacional'].mean()
-        media_baixo_estado = df_estado['Ativos com Baixo Nível Educacional'].mean()
-        media_pobres = df_estado['% de pobres'].mean()
-        media_saneamento_estado = df_estado['Taxa de Saneamento Básico'].mean()
+        media_alto_estado = media_est['Ativos com Alto Nível Educacional']
+        media_baixo_estado = media_est['Ativos com Baixo Nível Educacional']
+        media_pobres = media_est['% de pobres']
+        media_saneamento_estado = media_est['Taxa de Saneamento Básico']
 
-        media_nacional_alto = df['Ativos com Alto Nível Educacional'].mean()
-        media_nacional_baixo = df['Ativos com Baixo Nível Educacional'].mean()
-        media_nacional_pobres = df['% de pobres'].mean()
-        media_nacional_saneamento = df['Taxa de Saneamento Básico'].mean()
+        media_nacional_alto = media_nac['Ativos com Alto Nível Educacional']
+        media_nacional_baixo = media_nac['Ativos com Baixo Nível Educacional']
+        media_nacional_pobres = media_nac['% de pobres']
+        media_nacional_saneamento = media_nac['Taxa de Saneamento Básico']
             
         medicos = df_mun['Médicos por milhares de habitantes']
-        media_estado_medicos = df_estado['Médicos por milhares de habitantes'].mean()
-        media_nacional_medicos = df['Médicos por milhares de habitantes'].mean()
+        media_estado_medicos = media_est['Médicos por milhares de habitantes']
+        media_nacional_medicos = media_nac['Médicos por milhares de habitantes']
 
         hospitais = df_mun['Hospitais por milhares de habitantes']
-        media_estado_hospitais = df_estado['Hospitais por milhares de habitantes'].mean()
-        media_nacional_hospitais = df['Hospitais por milhares de habitantes'].mean()
+        media_estado_hospitais = media_est['Hospitais por milhares de habitantes']
+        media_nacional_hospitais = media_nac['Hospitais por milhares de habitantes']
             
         alto_nivel = df_mun['Ativos com Alto Nível Educacional']
         medio_nivel = df_mun['Ativos com Médio Nível Educacional']
@@ -544,7 +736,7 @@ elif st.session_state.page == 'municipality_detail':
             recomendacoes_educacao = []
             if alto_nivel < media_nacional_alto:
                 recomendacoes_educacao.append("• Investir em programas de educação superior e qualificação profissional")
-            if medio_nivel < df['Ativos com Médio Nível Educacional'].mean():
+            if medio_nivel < media_nac['Ativos com Médio Nível Educacional']:
                 recomendacoes_educacao.append("• Fortalecer programas de ensino técnico e profissionalizante")
             if baixo_nivel > media_nacional_baixo:
                 recomendacoes_educacao.append("• Desenvolver programas de redução da evasão escolar e educação de jovens e adultos")
@@ -588,144 +780,101 @@ elif st.session_state.page == 'municipality_detail':
 
         # Fechando todas as colunas anteriores
         st.write("")
+        secoes.mark('recomendacoes')
 
-        # Início da seção do simulador
-
+        # MUNICÍPIOS SEMELHANTES: vizinhos mais próximos nos indicadores socioeconômicos (sem o IDH)
         st.markdown("<br><hr style='margin: 30px 0; border: 0.5px solid #e6e6e6;'><br>", unsafe_allow_html=True)
+        st.markdown("<h3 style='margin: 20px 0; font-size: 1.1rem; font-weight: bold;'>Municípios Semelhantes</h3>", unsafe_allow_html=True)
 
-        # Função de callback para o reset
-        def reset_values():
-            # Atualizar diretamente os valores no Session State
-            st.session_state.pobres = float(mun_data['% de pobres'])
-            st.session_state.alto_nivel = float(mun_data['Ativos com Alto Nível Educacional'])
-            st.session_state.produtividade = float(mun_data['Produtividade'])
-            st.session_state.medicos = float(mun_data['Médicos por milhares de habitantes'])
-            st.session_state.media_salarial = float(mun_data['Média Salarial'])
-            st.session_state.pib = float(mun_data['PIB Municipal'])
-
-        # Título da seção
-        st.markdown("<p style='font-size: 1.1rem; font-weight: bold;'>Simulador de Impacto por Indicador Relevante</p>", unsafe_allow_html=True)
-
-        # Dados atuais do município
-        mun_data = get_municipality_data(df_filtered, st.session_state.selected_municipality)
-
-        # Inicializar valores no Session State (se ainda não existirem)
-        if 'pobres' not in st.session_state:
-            st.session_state.pobres = float(mun_data['% de pobres'])
-        if 'alto_nivel' not in st.session_state:
-            st.session_state.alto_nivel = float(mun_data['Ativos com Alto Nível Educacional'])
-        if 'produtividade' not in st.session_state:
-            st.session_state.produtividade = float(mun_data['Produtividade'])
-        if 'medicos' not in st.session_state:
-            st.session_state.medicos = float(mun_data['Médicos por milhares de habitantes'])
-        if 'media_salarial' not in st.session_state:
-            st.session_state.media_salarial = float(mun_data['Média Salarial'])
-        if 'pib' not in st.session_state:
-            st.session_state.pib = float(mun_data['PIB Municipal'])
-
-        # Criar colunas com espaçamento aumentado
-        col1, col2 = st.columns([1, 1], gap="large")
-
-        with col1:
-            st.markdown("<p style='font-weight: bold; margin-bottom: 20px;'>Ajuste os Indicadores:</p>", unsafe_allow_html=True)
-            
-            # Sliders para ajuste (sem value, usando apenas Session State)
-            st.slider(
-                "% de pobres",
-                min_value=0.0,
-                max_value=100.0,
-                key='pobres',
-                step=0.1
-            )
+        posicoes_pares, distancias_pares = nearest_peers(load_peers(), row_position(index, estado_mun, municipio), k=5)
+        df_pares = df.iloc[posicoes_pares][['nomeLocalidade', 'estado', 'IDH', 'População residente', '% de pobres', 'Média Salarial']]
+        df_pares = df_pares.assign(**{
+            'Diferença de IDH': df_pares['IDH'] - df_mun['IDH'],
+            'Distância': distancias_pares
+        }).rename(columns={'nomeLocalidade': 'Município', 'estado': 'Estado', 'População residente': 'População'})
 
-            st.slider(
-                "Ativos com Alto Nível Educacional (%)",
-                min_value=0.0,
-                max_value=50.0,
-                key='alto_nivel',
-                step=0.1
-            )
+        st.dataframe(
+            df_pares,
+            column_config={
+                "IDH": st.column_config.NumberColumn(format="%.3f"),
+                "População": st.column_config.NumberColumn(format="%d"),
+                "% de pobres": st.column_config.NumberColumn(format="%.1f%%"),
+                "Média Salarial": st.column_config.NumberColumn(format="R$ %.2f"),
+                "Diferença de IDH": st.column_config.NumberColumn(format="%+.3f"),
+                "Distância": st.column_config.NumberColumn(format="%.2f")
+            },
+            hide_index=True,
+            use_container_width=True
+        )
+        st.caption("Semelhança medida pela distância entre os indicadores padronizados (população, urbanização, saneamento, educação, pobreza, renda, produtividade, PIB e saúde), sem considerar o IDH.")
 
-            st.slider(
-                "Produtividade (R$)",
-                min_value=0.0,
-                max_value=float(df_filtered['Produtividade'].max()),
-                key='produtividade',
-                step=100.0
-            )
+        for coluna, (_, par) in zip(st.columns(len(df_pares)), df_pares.iterrows()):
+            if coluna.button(f"Ver {par['Município']}", key=f"par_{par['Estado']}_{par['Município']}", use_container_width=True):
+                st.session_state.selected_municipality = (par['Estado'], par['Município'])
+                st.rerun()
+        secoes.mark('semelhantes')
 
-            st.slider(
-                "Médicos por milhares de habitantes",
-                min_value=0.0,
-                max_value=float(df_filtered['Médicos por milhares de habitantes'].max()),
-                key='medicos',
-                step=0.001
-            )
+        # Início da seção do simulador
 
-            st.slider(
-                "Média Salarial (R$)",
-                min_value=500.0,
-                max_value=5000.0,
-                key='media_salarial',
-                step=50.0
-            )
+        st.markdown("<br><hr style='margin: 30px 0; border: 0.5px solid #e6e6e6;'><br>", unsafe_allow_html=True)
 
-            st.slider(
-                "PIB Municipal (R$)",
-                min_value=0.0,
-                max_value=float(df_filtered['PIB Municipal'].max()),
-                key='pib',
-                step=1000.0
+        # Dados atuais do município (mesma linha já resolvida pelo índice)
+        mun_data = df_mun
+        with st.spinner('Preparando modelo...'):
+            prepare_model()
+            prepare_fast_model()
+            prepare_scaler()
+        simulador(st.session_state.selected_municipality, mun_data)
+        secoes.mark('simulador')
+
+        # Curvas de resposta: uma feature varia por vez, as demais ficam nos valores do município
+        with st.expander("Sensibilidade do IDH por indicador"):
+            import plotly.express as px
+
+            df_curvas = load_response_curves(st.session_state.selected_municipality)
+            fig_curvas = px.line(
+                df_curvas,
+                x='Valor',
+                y='IDH Previsto',
+                facet_col='Indicador',
+                facet_col_wrap=3,
+                facet_col_spacing=0.06,
+                facet_row_spacing=0.15
             )
+            fig_curvas.for_each_annotation(lambda a: a.update(text=a.text.split('=')[-1]))
+            fig_curvas.update_xaxes(matches=None, showticklabels=True, title_text='')
+            fig_curvas.add_hline(y=float(mun_data['IDH']), line_dash='dot', line_color='gray')
+            fig_curvas.update_layout(height=520, margin=dict(t=40))
+            st.plotly_chart(fig_curvas, use_container_width=True)
+            st.caption("Cada curva varia um indicador dentro do intervalo do simulador, mantendo os demais nos valores atuais do município. A linha pontilhada marca o IDH atual.")
+            secoes.mark('curvas')
+
+record('app.execucao', (time.perf_counter() - inicio_execucao) * 1000)
+
+# Percentis por span, agregados de todas as sessões deste processo
+if DEBUG:
+    with st.sidebar:
+        st.markdown("### Desempenho")
+        resumo = percentiles()
+        st.dataframe(
+            pd.DataFrame.from_dict(resumo, orient='index'),
+            column_config={
+                "n": st.column_config.NumberColumn(format="%d"),
+                "p50_ms": st.column_config.NumberColumn("p50 (ms)", format="%.2f"),
+                "p95_ms": st.column_config.NumberColumn("p95 (ms)", format="%.2f"),
+                "p99_ms": st.column_config.NumberColumn("p99 (ms)", format="%.2f"),
+                "max_ms": st.column_config.NumberColumn("máx (ms)", format="%.2f")
+            },
+            use_container_width=True
+        )
+        cache_stats = load_prediction_cache().stats()
+        st.caption(f"Cache do simulador: {cache_stats['hits']} acertos, {cache_stats['misses']} faltas ({cache_stats['hit_rate']:.0%}), {cache_stats['size']}/{cache_stats['max_size']} entradas")
+        st.download_button("Exportar métricas (JSON)", export_metrics(), file_name='metricas_idh_expert.json', mime='application/json')
+        if st.button("Zerar métricas"):
+            reset()
+            st.rerun()
 
-            # Botão de reset após os sliders
-            st.button("Resetar Valores", on_click=reset_values)
-
-        with col2:
-            st.markdown("<p style='font-weight: bold; margin-bottom: 20px;'>Impacto Estimado no IDH:</p>", unsafe_allow_html=True)
-            
-            # Preparar dados para previsão
-            input_data = pd.DataFrame({
-                '% de pobres': [st.session_state.pobres],
-                'Ativos com Alto Nível Educacional': [st.session_state.alto_nivel],
-                'Produtividade': [st.session_state.produtividade],
-                'Médicos por milhares de habitantes': [st.session_state.medicos],
-                'Média Salarial': [st.session_state.media_salarial],
-                'PIB Municipal': [st.session_state.pib]
-            })[features]
-
-            # Fazer previsão
-            idh_previsto = predict_idh(model, scaler, features, input_data)
-            
-            # Mostrar IDH Atual
-            col2.metric(
-                "IDH Atual",
-                f"{mun_data['IDH']:.3f}"
-            )
-            
-            # Calcular diferença
-            diferenca = idh_previsto - mun_data['IDH']
-            
-            # Verificar se houve alteração nos valores originais
-            valores_alterados = (
-                st.session_state.pobres != float(mun_data['% de pobres']) or
-                st.session_state.alto_nivel != float(mun_data['Ativos com Alto Nível Educacional']) or
-                st.session_state.produtividade != float(mun_data['Produtividade']) or
-                st.session_state.medicos != float(mun_data['Médicos por milhares de habitantes']) or
-                st.session_state.media_salarial != float(mun_data['Média Salarial']) or
-                st.session_state.pib != float(mun_data['PIB Municipal'])
-            )
-            
-            # Mostrar IDH Previsto
-            if valores_alterados:
-                col2.metric(
-                    "IDH Previsto",
-                    f"{idh_previsto:.3f}",
-                    f"{diferenca:+.3f}"
-                )
-            else:
-                col2.metric(
-                    "IDH Previsto",
-                    f"{mun_data['IDH']:.3f}",
-                    None
-                )
\ No newline at end of file
+# Métricas em JSON no log, no máximo uma vez por minuto: IDH_METRICS_LOG=- (stderr) ou =arquivo
+if os.environ.get('IDH_METRICS_LOG'):
+    configure_logging(os.environ['IDH_METRICS_LOG'])
+    maybe_log_metrics()
@@ -0,0 +1,53 @@
+# Compara a latência por previsão do caminho com DMatrix e do avaliador NumPy.
+# Uso: python -m benchmarks.bench_inference [--repeticoes N]
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+from models.xgb_model import load_trained_model, load_fast_model, predict_idh, predict_idh_batch, predict_idh_fast
+from utils.dataset_cache import load_dataset
+
+
+def _latencia_us(func, repeticoes):
+    func()  # aquecimento
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        func()
+    return (time.perf_counter() - inicio) / repeticoes * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Latência por previsão do modelo de IDH')
+    parser.add_argument('--repeticoes', type=int, default=500)
+    args = parser.parse_args()
+
+    model, scaler, features = load_trained_model()
+    forest = load_fast_model()
+    df = load_dataset('df_exported.csv')
+    valores = df[features].to_numpy()
+    linha = valores[0].tolist()
+
+    # Caminho original do simulador: DataFrame + scaler.transform + DMatrix
+    def original():
+        entrada = pd.DataFrame([linha], columns=features)
+        escalonado = scaler.transform(entrada[features])
+        return model.predict(xgb.DMatrix(escalonado, feature_names=features))[0]
+
+    resultados = {
+        'DataFrame + DMatrix (original)': _latencia_us(original, args.repeticoes),
+        'predict_idh': _latencia_us(lambda: predict_idh(model, scaler, features, pd.DataFrame([linha], columns=features)), args.repeticoes),
+        'predict_idh_fast': _latencia_us(lambda: predict_idh_fast(forest, scaler, features, linha), args.repeticoes),
+    }
+    for nome, us in resultados.items():
+        print(f"{nome:<32} {us:10.1f} µs/previsão")
+
+    # Conferência de equivalência com o Booster em todo o dataset
+    diferenca = np.abs(predict_idh_batch(model, scaler, features, valores) - predict_idh_fast(forest, scaler, features, valores))
+    print(f"Maior diferença absoluta vs Booster ({len(valores)} linhas): {diferenca.max():.2e}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+# Relatório de custo de importação (python -X importtime), por pacote e por página do app.
+# Uso:
+#   python -m benchmarks.import_report                 # módulos carregados por app.py no início
+#   python -m benchmarks.import_report pandas xgboost  # módulos específicos
+#   python -m benchmarks.import_report --paginas       # cada página renderizada via AppTest
+import argparse
+import ast
+import json
+import subprocess
+import sys
+from collections import defaultdict
+
+APP_PATH = 'app.py'
+
+PAGES = ['home', 'filter_state', 'municipality_detail']
+
+# Pacotes do modelo, que não devem ser importados na página inicial
+MODEL_PACKAGES = ['xgboost', 'sklearn']
+
+_PAGE_SCRIPT = """
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file('app.py', default_timeout=120)
+at.session_state['page'] = {page!r}
+at.session_state['selected_municipality'] = {municipality!r}
+at.run()
+"""
+
+
+def app_modules(path=APP_PATH):
+    # Módulos importados no nível superior de app.py, antes de qualquer página (os importados dentro das
+    # páginas e das funções ficam de fora), lidos do próprio código para não ficarem desatualizados
+    with open(path, encoding='utf-8') as f:
+        arvore = ast.parse(f.read(), filename=path)
+    modulos = []
+    for node in arvore.body:
+        if isinstance(node, ast.Import):
+            modulos.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module:
+            modulos.append(node.module)
+    return list(dict.fromkeys(modulos))
+
+
+def parse_importtime(stderr):
+    # Soma o tempo cumulativo das importações de primeiro nível, agrupado pelo pacote raiz
+    por_pacote = defaultdict(int)
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        _, cumulativo, nome = line.split('|')
+        recuo = len(nome) - len(nome.lstrip()) - 1
+        if recuo == 0:
+            por_pacote[nome.strip().split('.')[0]] += int(cumulativo)
+    return dict(sorted(por_pacote.items(), key=lambda item: -item[1]))
+
+
+def run_importtime(code):
+    resultado = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        capture_output=True, text=True, check=False
+    )
+    if resultado.returncode != 0:
+        raise RuntimeError(resultado.stderr[-2000:])
+    return parse_importtime(resultado.stderr)
+
+
+def report_modules(modules):
+    return run_importtime('\n'.join(f"import {module}" for module in modules))
+
+
+def report_pages(municipality=('Acre', 'Acrelândia')):
+    # Cada página em um processo novo, para medir a partida a frio
+    base = run_importtime("from streamlit.testing.v1 import AppTest")
+    relatorio = {}
+    for page in PAGES:
+        pacotes = run_importtime(_PAGE_SCRIPT.format(page=page, municipality=municipality))
+        relatorio[page] = {nome: us for nome, us in pacotes.items() if nome not in base}
+    return relatorio
+
+
+def _print_table(titulo, pacotes, limite=15):
+    total = sum(pacotes.values())
+    print(f"\n{titulo} (total {total / 1000:.0f} ms)")
+    for nome, us in list(pacotes.items())[:limite]:
+        print(f"  {nome:<28} {us / 1000:9.1f} ms")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Custo de importação a frio dos módulos do IDH Expert")
+    parser.add_argument('modulos', nargs='*', help="módulos a importar (padrão: os importados por app.py)")
+    parser.add_argument('--paginas', action='store_true', help="mede cada página renderizada via AppTest")
+    parser.add_argument('--json', action='store_true', help="saída em JSON (µs por pacote)")
+    args = parser.parse_args(argv)
+
+    if args.paginas:
+        relatorio = report_pages()
+    else:
+        relatorio = {'modulos': report_modules(args.modulos or app_modules())}
+
+    if args.json:
+        print(json.dumps(relatorio, ensure_ascii=False, indent=2))
+        return
+
+    for titulo, pacotes in relatorio.items():
+        _print_table(titulo, pacotes)
+    if 'home' in relatorio:
+        pesados = [nome for nome in MODEL_PACKAGES if nome in relatorio['home']]
+        print(f"\nPacotes de modelo importados na página inicial: {', '.join(pesados) or 'nenhum'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,335 @@
+# Suíte de benchmarks: carga de dados, renderização das páginas (AppTest), inferência,
+# score de potencial e rankings. Resultados em JSON, comparáveis com uma baseline salva.
+# Uso:
+#   python -m benchmarks.run_benchmarks --saida resultados.json
+#   python -m benchmarks.run_benchmarks --salvar-baseline
+#   python -m benchmarks.run_benchmarks --comparar benchmarks/baseline.json --tolerancia 0.25
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+DATA_PATH = 'df_exported.csv'
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app.py')
+BASELINE_PATH = 'benchmarks/baseline.json'
+MUNICIPIO = ('Acre', 'Acrelândia')
+
+BENCHMARKS = {}
+
+
+def benchmark(nome, repeticoes=20, memoria=False):
+    # Registra uma função de preparo que devolve o callable a ser medido
+    def registrar(setup):
+        BENCHMARKS[nome] = {'setup': setup, 'repeticoes': repeticoes, 'memoria': memoria}
+        return setup
+    return registrar
+
+
+def measure(func, repeticoes, memoria=False):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        func()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+
+    resultado = {
+        'repeticoes': repeticoes,
+        'min_ms': float(np.min(tempos)),
+        'mediana_ms': float(np.median(tempos)),
+        'p95_ms': float(np.percentile(tempos, 95)),
+    }
+    if memoria:
+        tracemalloc.start()
+        func()
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        resultado['pico_memoria_mb'] = pico / 1e6
+    return resultado
+
+
+# --- Carga de dados ---
+
+@benchmark('carga_csv', repeticoes=10, memoria=True)
+def _carga_csv():
+    return lambda: pd.read_csv(DATA_PATH)
+
+
+@benchmark('carga_cache_colunar', repeticoes=10, memoria=True)
+def _carga_cache():
+    from utils.dataset_cache import load_dataset
+    load_dataset(DATA_PATH)  # garante o cache em disco
+    return lambda: load_dataset(DATA_PATH)
+
+
+@benchmark('carga_compacta', repeticoes=10, memoria=True)
+def _carga_compacta():
+    from utils.compact import classify_idh, compact_dataset
+    from utils.dataset_cache import load_dataset
+
+    def carregar():
+        df = compact_dataset(load_dataset(DATA_PATH))
+        return df.assign(classificacao_idh=classify_idh(df['IDH']))
+    carregar()
+    return carregar
+
+
+# --- Renderização das páginas (headless) ---
+
+def _pagina(page):
+    from streamlit.testing.v1 import AppTest
+
+    def render():
+        at = AppTest.from_file(APP_PATH, default_timeout=120)
+        at.session_state['page'] = page
+        at.session_state['selected_municipality'] = MUNICIPIO
+        at.run()
+        if at.exception:
+            raise RuntimeError(f"Página {page} falhou: {at.exception[0].message}")
+    render()  # aquecimento dos caches do Streamlit
+    return render
+
+
+@benchmark('pagina_home', repeticoes=5)
+def _pagina_home():
+    return _pagina('home')
+
+
+@benchmark('pagina_filter_state', repeticoes=5)
+def _pagina_filter_state():
+    return _pagina('filter_state')
+
+
+@benchmark('pagina_municipality_detail', repeticoes=5)
+def _pagina_detail():
+    return _pagina('municipality_detail')
+
+
+# --- Inferência ---
+
+def _modelo():
+    from models.xgb_model import load_trained_model
+    from utils.dataset_cache import load_dataset
+    model, scaler, features = load_trained_model()
+    return model, scaler, features, load_dataset(DATA_PATH)
+
+
+@benchmark('predict_idh_linha', repeticoes=200)
+def _predict_linha():
+    from models.xgb_model import predict_idh
+    model, scaler, features, df = _modelo()
+    linha = df[features].iloc[[0]]
+    return lambda: predict_idh(model, scaler, features, linha)
+
+
+@benchmark('predict_idh_fast_linha', repeticoes=500)
+def _predict_fast_linha():
+    from models.xgb_model import load_fast_model, predict_idh_fast
+    _, scaler, features, df = _modelo()
+    forest = load_fast_model()
+    linha = df[features].iloc[0].tolist()
+    return lambda: predict_idh_fast(forest, scaler, features, linha)
+
+
+@benchmark('predict_faixa_conjunto_linha', repeticoes=500)
+def _predict_faixa_linha():
+    from models.ensemble import load_ensemble, predict_band
+    from models.tree_eval import stack_forests
+    from models.xgb_model import load_fast_model
+    _, scaler, features, df = _modelo()
+    forest = load_fast_model()
+    # Sem os quantis deste modelo, duas cópias do modelo principal no lugar deles
+    conjunto = load_ensemble(forest) or stack_forests([forest] * 3)
+    linha = df[features].iloc[0].tolist()
+    return lambda: predict_band(conjunto, scaler, features, linha)
+
+
+@benchmark('predict_idh_lote_dataset', repeticoes=20)
+def _predict_lote():
+    from models.xgb_model import predict_idh_batch
+    model, scaler, features, df = _modelo()
+    valores = df[features].to_numpy()
+    return lambda: predict_idh_batch(model, scaler, features, valores)
+
+
+@benchmark('goal_seek_meta', repeticoes=5)
+def _goal_seek():
+    from models.goal_seek import goal_seek
+    from models.xgb_model import predict_idh_batch
+    model, scaler, features, df = _modelo()
+    base = df[features].iloc[0].to_numpy(dtype=np.float64)
+    limites = [(0.0, 100.0), (0.0, 50.0), (0.0, float(df['Produtividade'].max())), (0.0, float(df['Médicos por milhares de habitantes'].max())), (500.0, 5000.0), (0.0, float(df['PIB Municipal'].max()))]
+    passos = [0.1, 0.1, 100.0, 0.001, 50.0, 1000.0]
+    meta = float(predict_idh_batch(model, scaler, features, base)[0]) + 0.05
+    return lambda: goal_seek(lambda matriz: predict_idh_batch(model, scaler, features, matriz), base, limites, meta, passos)
+
+
+# --- Score de potencial e rankings ---
+
+@benchmark('score_potencial_nacional_top10', repeticoes=200)
+def _score():
+    from utils.dataset_cache import load_dataset
+    from utils.scoring import build_score_inputs, investment_scores, top_k
+    entradas = build_score_inputs(load_dataset(DATA_PATH))
+    return lambda: top_k(investment_scores(entradas, escopo='nacional'), 10)
+
+
+@benchmark('rankings_construcao', repeticoes=20)
+def _rankings_construcao():
+    from utils.dataset_cache import load_dataset
+    from utils.rankings import build_rankings
+    df = load_dataset(DATA_PATH)
+    return lambda: build_rankings(df)
+
+
+@benchmark('derivados_atualizacao_estado', repeticoes=10)
+def _derivados_atualizacao():
+    # Agregados, rankings e correlações após uma atualização que só toca um estado
+    from utils.aggregates import build_aggregates, update_aggregates
+    from utils.compact import load_app_dataset
+    from utils.correlations import build_correlations, update_correlations
+    from utils.rankings import build_rankings, update_rankings
+    df = load_app_dataset(DATA_PATH)
+    ate100k = df[df['População residente'] <= 100000]
+    aggregates, rankings, correlations = build_aggregates(df), build_rankings(df), build_correlations(ate100k)
+
+    def atualizar():
+        update_aggregates(aggregates, df, [MUNICIPIO[0]])
+        update_rankings(rankings, df, [MUNICIPIO[0]])
+        update_correlations(correlations, ate100k, [MUNICIPIO[0]])
+    return atualizar
+
+
+@benchmark('ranking_pagina_formatada', repeticoes=200)
+def _ranking_pagina():
+    from utils.dataset_cache import load_dataset
+    from utils.formatting import format_table
+    from utils.rankings import build_rankings, page_positions, ranking_positions
+    df = load_dataset(DATA_PATH)
+    rankings = build_rankings(df)
+    colunas = ['estado', 'nomeLocalidade', 'IDH', 'População residente', '% de pobres', 'Produtividade', 'PIB Municipal']
+    return lambda: format_table(df.iloc[page_positions(ranking_positions(rankings, 'IDH', 'Bahia'), 3, 10)][colunas])
+
+
+# --- Tabelas de diagnóstico da página de detalhes ---
+
+def _diagnostico():
+    from utils.aggregates import build_aggregates
+    from utils.correlations import load_or_build_correlations
+    from utils.dataset_cache import dataset_hash, load_dataset
+    from utils.municipality_index import build_index, lookup_row
+    df = load_dataset(DATA_PATH)
+    data_hash = dataset_hash(DATA_PATH)
+    correlations = load_or_build_correlations(df[df['População residente'] <= 100000], data_hash, scope='ate100k')
+    return df, data_hash, build_aggregates(df), correlations, lookup_row(df, build_index(df), *MUNICIPIO)
+
+
+@benchmark('tabelas_diagnostico_render', repeticoes=50)
+def _tabelas_render():
+    from utils.diagnostics import render_tables
+    _, _, aggregates, correlations, mun = _diagnostico()
+    return lambda: render_tables(mun, aggregates, correlations)
+
+
+@benchmark('tabelas_diagnostico_cache', repeticoes=200)
+def _tabelas_cache():
+    from utils.diagnostics import diagnostic_tables
+    _, data_hash, aggregates, correlations, mun = _diagnostico()
+    diagnostic_tables(data_hash, mun, aggregates, correlations)  # garante a entrada em cache
+    return lambda: diagnostic_tables(data_hash, mun, aggregates, correlations)
+
+
+@benchmark('vizinhos_consulta', repeticoes=500)
+def _vizinhos():
+    from utils.dataset_cache import dataset_hash, load_dataset
+    from utils.peers import load_or_build_peers, nearest_peers
+    peers = load_or_build_peers(load_dataset(DATA_PATH), dataset_hash(DATA_PATH))
+    return lambda: nearest_peers(peers, 0, k=5)
+
+
+@benchmark('grafico_estados_construcao', repeticoes=20)
+def _grafico_construcao():
+    from utils.compact import load_app_dataset
+    from utils.figures import idh_por_estado
+    df = load_app_dataset(DATA_PATH)
+    return lambda: idh_por_estado(df)
+
+
+@benchmark('grafico_estados_cache', repeticoes=200)
+def _grafico_cache():
+    from utils.compact import load_app_dataset
+    from utils.dataset_cache import dataset_hash
+    from utils.figures import figure_spec
+    df = load_app_dataset(DATA_PATH)
+    data_hash = dataset_hash(DATA_PATH)
+    figure_spec(data_hash, 'idh_por_estado', df)  # garante a figura em disco
+    return lambda: figure_spec(data_hash, 'idh_por_estado', df)
+
+
+def run(nomes=None):
+    resultados = {}
+    for nome, config in BENCHMARKS.items():
+        if nomes and nome not in nomes:
+            continue
+        func = config['setup']()
+        resultados[nome] = measure(func, config['repeticoes'], config['memoria'])
+        print(f"{nome:<32} mediana {resultados[nome]['mediana_ms']:10.3f} ms", file=sys.stderr)
+    return {
+        'meta': {
+            'data': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'plataforma': platform.platform(),
+        },
+        'resultados': resultados,
+    }
+
+
+def compare(atual, baseline, tolerancia):
+    # Regressão: mediana atual acima de (1 + tolerancia) x mediana da baseline
+    regressoes = []
+    for nome, resultado in atual['resultados'].items():
+        base = baseline['resultados'].get(nome)
+        if base is None:
+            continue
+        razao = resultado['mediana_ms'] / max(base['mediana_ms'], 1e-9)
+        status = 'REGRESSÃO' if razao > 1 + tolerancia else 'ok'
+        print(f"{nome:<32} {base['mediana_ms']:10.3f} -> {resultado['mediana_ms']:10.3f} ms  x{razao:5.2f}  {status}")
+        if status != 'ok':
+            regressoes.append(nome)
+    return regressoes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks do IDH Expert")
+    parser.add_argument('--apenas', nargs='+', metavar='NOME', choices=list(BENCHMARKS), help="executa só estes benchmarks")
+    parser.add_argument('--saida', help="grava os resultados em JSON neste arquivo (padrão: stdout)")
+    parser.add_argument('--salvar-baseline', nargs='?', const=BASELINE_PATH, metavar='ARQUIVO', help=f"grava os resultados como baseline (padrão: {BASELINE_PATH})")
+    parser.add_argument('--comparar', metavar='BASELINE', help="compara com uma baseline e sai com código 1 se houver regressão")
+    parser.add_argument('--tolerancia', type=float, default=0.25, help="aumento relativo tolerado da mediana (padrão: 0.25)")
+    args = parser.parse_args(argv)
+
+    resultados = run(args.apenas)
+
+    for destino in filter(None, [args.saida, args.salvar_baseline]):
+        with open(destino, 'w', encoding='utf-8') as f:
+            json.dump(resultados, f, ensure_ascii=False, indent=2)
+    if not args.saida and not args.salvar_baseline and not args.comparar:
+        print(json.dumps(resultados, ensure_ascii=False, indent=2))
+
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressoes = compare(resultados, baseline, args.tolerancia)
+        if regressoes:
+            print(f"\n{len(regressoes)} regressão(ões): {', '.join(regressoes)}", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+# Pontuação em lote de cenários fora do Streamlit.
+# Uso: python -m models.batch_score cenarios.csv previsoes.csv [--chunksize N] [--workers N]
+import argparse
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from models.xgb_model import FEATURES, load_trained_model, predict_idh_batch
+
+_worker_model = None
+
+
+def _init_worker(nthread):
+    # Cada processo carrega o modelo uma única vez
+    global _worker_model
+    model, scaler, features = load_trained_model()
+    if nthread:
+        model.set_param({'nthread': nthread})
+    _worker_model = (model, scaler, features)
+
+
+def _score_chunk(values):
+    model, scaler, features = _worker_model
+    return predict_idh_batch(model, scaler, features, values)
+
+
+def _chunks(path, chunksize, usecols):
+    for chunk in pd.read_csv(path, chunksize=chunksize, usecols=usecols):
+        faltando = [feature for feature in FEATURES if feature not in chunk.columns]
+        if faltando:
+            raise ValueError(f"Colunas ausentes no arquivo de entrada: {', '.join(faltando)}")
+        yield chunk
+
+
+def score_file(input_path, output_path, chunksize=100000, workers=None, keep_columns=None, output_column='IDH Previsto', progress=sys.stderr):
+    # Lê em blocos, distribui os blocos entre processos e grava as previsões na ordem de entrada.
+    # No máximo 2 * workers blocos ficam em memória ao mesmo tempo.
+    workers = os.cpu_count() if workers is None else workers
+    usecols = None if keep_columns is None else list(dict.fromkeys(keep_columns + FEATURES))
+    keep = None if keep_columns is None else list(dict.fromkeys(keep_columns))
+
+    total = 0
+    inicio = time.perf_counter()
+    header = True
+
+    def write(chunk, predictions):
+        nonlocal total, header
+        saida = chunk if keep is None else chunk[keep]
+        saida = saida.assign(**{output_column: predictions})
+        saida.to_csv(output_path, mode='w' if header else 'a', header=header, index=False)
+        header = False
+        total += len(chunk)
+        if progress is not None:
+            decorrido = time.perf_counter() - inicio
+            print(f"{total:,} linhas | {total / decorrido:,.0f} linhas/s", file=progress, flush=True)
+
+    if workers <= 1:
+        _init_worker(None)
+        for chunk in _chunks(input_path, chunksize, usecols):
+            write(chunk, _score_chunk(chunk[FEATURES].to_numpy(dtype=np.float64)))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(1,)) as pool:
+            pendentes = deque()
+            for chunk in _chunks(input_path, chunksize, usecols):
+                pendentes.append((chunk, pool.submit(_score_chunk, chunk[FEATURES].to_numpy(dtype=np.float64))))
+                while len(pendentes) >= 2 * workers:
+                    chunk_pronto, future = pendentes.popleft()
+                    write(chunk_pronto, future.result())
+            while pendentes:
+                chunk_pronto, future = pendentes.popleft()
+                write(chunk_pronto, future.result())
+
+    if header:
+        # Entrada vazia: grava ao menos o cabeçalho
+        pd.DataFrame(columns=(keep or FEATURES) + [output_column]).to_csv(output_path, index=False)
+    return total, time.perf_counter() - inicio
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prevê o IDH para cada linha de um CSV de cenários com as 6 features do modelo.")
+    parser.add_argument('entrada', help="CSV com as colunas: " + ', '.join(FEATURES))
+    parser.add_argument('saida', help="CSV de saída (colunas de entrada + previsão)")
+    parser.add_argument('--chunksize', type=int, default=100000, help="linhas por bloco (padrão: 100000)")
+    parser.add_argument('--workers', type=int, default=None, help="processos de pontuação (padrão: número de CPUs; 1 = sem pool)")
+    parser.add_argument('--manter', nargs='+', default=None, metavar='COLUNA', help="colunas de entrada copiadas para a saída (padrão: todas)")
+    parser.add_argument('--coluna-saida', default='IDH Previsto', help="nome da coluna de previsão")
+    args = parser.parse_args(argv)
+
+    total, duracao = score_file(args.entrada, args.saida, args.chunksize, args.workers, args.manter, args.coluna_saida)
+    print(f"Concluído: {total:,} linhas em {duracao:.1f}s ({total / max(duracao, 1e-9):,.0f} linhas/s) -> {args.saida}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+# Faixa de incerteza do simulador: dois boosters de regressão quantílica (percentis 5 e 95 do IDH), gravados
+# ao lado do modelo principal. A previsão pontual continua a do modelo principal; os três modelos são
+# empilhados e avaliados numa única travessia, com custo fixo (não cresce com a quantidade de membros).
+# Os parâmetros de treino dos quantis ficam versionados em params.json, junto dos modelos.
+# Uso offline: python -m models.ensemble [caminho_do_csv]
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from models.tree_eval import load_forest, predict_members, stack_forests
+from models.xgb_model import scale_features
+from utils.profiling import timed
+
+ENSEMBLE_DIR = 'models/quantis_6vars'
+_PARAMS = 'params.json'
+_MANIFEST = 'manifest.json'
+
+# Faixa exibida: um booster por percentil do IDH
+BAND_PERCENTILES = (5, 95)
+
+
+def _quantile_path(ensemble_dir, percentil):
+    return os.path.join(ensemble_dir, f"quantil_{percentil:02d}.json")
+
+
+def load_params(ensemble_dir=ENSEMBLE_DIR):
+    # Parâmetros de treino versionados; sem eles o conjunto não é treinado (não há valores padrão implícitos)
+    path = os.path.join(ensemble_dir, _PARAMS)
+    try:
+        with open(path, encoding='utf-8') as f:
+            params = json.load(f)
+    except (OSError, ValueError) as erro:
+        raise ValueError(f"Parâmetros de treino ausentes ou inválidos em {path}: {erro}") from None
+    faltando = [key for key in ['rodadas', 'parametros'] if key not in params]
+    if faltando:
+        raise ValueError(f"Parâmetros de treino incompletos em {path}: falta {', '.join(faltando)}")
+    return params
+
+
+def build_ensemble(df, ensemble_dir=ENSEMBLE_DIR):
+    # Mesmo recorte do app (até 100 mil habitantes) e mesmo scaler do modelo principal
+    import xgboost as xgb
+
+    from models.precompute import model_hash
+    from models.xgb_model import FEATURES, load_scaler
+
+    params = load_params(ensemble_dir)
+    dados = df[df['População residente'] <= 100000]
+    x = scale_features(load_scaler(), dados[FEATURES].to_numpy(dtype=np.float64))
+    dtrain = xgb.DMatrix(x, label=dados['IDH'].to_numpy(dtype=np.float64), feature_names=list(FEATURES))
+
+    for percentil in BAND_PERCENTILES:
+        treino = dict(params['parametros'], objective='reg:quantileerror', quantile_alpha=percentil / 100)
+        xgb.train(treino, dtrain, num_boost_round=params['rodadas']).save_model(_quantile_path(ensemble_dir, percentil))
+
+    manifest = {'metodo': 'quantis', 'percentis': list(BAND_PERCENTILES), 'rodadas': params['rodadas'], 'parametros': params['parametros'], 'linhas': len(x), 'modelo': model_hash()}
+    with open(os.path.join(ensemble_dir, _MANIFEST), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return manifest
+
+
+@timed()
+def load_ensemble(base_forest, ensemble_dir=ENSEMBLE_DIR):
+    # Floresta empilhada: modelo principal (coluna 0) e os boosters dos percentis inferior e superior;
+    # None sem os quantis treinados ou se eles foram treinados para outra versão do modelo
+    from models.precompute import model_hash
+
+    try:
+        with open(os.path.join(ensemble_dir, _MANIFEST), encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest['modelo'] != model_hash() or manifest['percentis'] != list(BAND_PERCENTILES):
+        return None
+
+    quantis = [load_forest(_quantile_path(ensemble_dir, percentil)) for percentil in BAND_PERCENTILES]
+    return stack_forests([base_forest] + quantis)
+
+
+@timed()
+def predict_band(stacked, scaler, features, values):
+    # Uma travessia para os três modelos: (previsão do modelo principal, limite inferior, limite superior)
+    from models.xgb_model import as_feature_matrix
+
+    previsoes = predict_members(stacked, scale_features(scaler, as_feature_matrix(features, values)))
+    return previsoes[:, 0], previsoes[:, 1], previsoes[:, 2]
+
+
+def main(argv=None):
+    from utils.dataset_cache import load_dataset
+
+    parser = argparse.ArgumentParser(description="Treina os boosters quantílicos usados na faixa de incerteza do simulador.")
+    parser.add_argument('dataset', nargs='?', default='df_exported.csv', help="CSV do dataset (padrão: df_exported.csv)")
+    parser.add_argument('--dir', default=ENSEMBLE_DIR, help=f"diretório com params.json e de saída (padrão: {ENSEMBLE_DIR})")
+    args = parser.parse_args(argv)
+
+    inicio = time.perf_counter()
+    try:
+        manifest = build_ensemble(load_dataset(args.dataset), args.dir)
+    except ValueError as erro:
+        parser.error(str(erro))
+    print(f"Quantis {', '.join(map(str, manifest['percentis']))} treinados com {manifest['linhas']} municípios em {time.perf_counter() - inicio:.1f}s ({args.dir})", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+import time
+
+import numpy as np
+
+from models.sensitivity import sweep_matrix
+
+
+def snap_to_steps(values, bounds, steps):
+    # Arredonda para a grade dos sliders (mínimo + k * passo), dentro dos limites
+    low, high = np.asarray(bounds, dtype=np.float64).T
+    snapped = low + np.round((values - low) / steps) * steps
+    return np.clip(snapped, low, high)
+
+
+def goal_seek(predict, base_values, bounds, target, steps, time_budget=0.5, batch_size=4096, max_evaluations=200000, patience=16, seed=0):
+    # Busca a menor mudança normalizada (soma de |Δ| / amplitude do slider) que leva a previsão ao IDH alvo
+    # ou acima dele; se a previsão com os valores atuais já atinge a meta, devolve-os sem buscar nada.
+    # predict recebe uma matriz (linhas = cenários) e devolve as previsões: avaliação sempre em lote.
+    # Fases: varredura de cada feature isolada; direções aleatórias e refinamento local em torno da melhor
+    # solução, até esgotar o tempo, as avaliações ou `patience` lotes sem melhora; por fim, cada feature
+    # alterada é aproximada do valor do município enquanto a meta continuar alcançada.
+    inicio = time.perf_counter()
+    prazo = inicio + time_budget
+    rng = np.random.default_rng(seed)
+
+    base = np.asarray(base_values, dtype=np.float64)
+    steps = np.asarray(steps, dtype=np.float64)
+    low, high = np.asarray(bounds, dtype=np.float64).T
+    amplitude = np.where(high > low, high - low, 1.0)
+    base_grid = snap_to_steps(base, bounds, steps)
+
+    atual = float(predict(base[None, :])[0])
+    melhor = {'valores': base.copy(), 'idh': atual, 'distancia': 0.0, 'alcancado': atual >= target}
+    if melhor['alcancado']:
+        return _resultado(melhor, 1, inicio)
+
+    mais_proximo = {'valores': base.copy(), 'idh': atual}
+    avaliacoes = 1
+
+    def avaliar(candidatos):
+        nonlocal avaliacoes
+        candidatos = snap_to_steps(candidatos, bounds, steps)
+        # Features não alteradas continuam exatamente no valor do município (fora da grade do slider)
+        candidatos = np.where(candidatos == base_grid, base, candidatos)
+        previsoes = np.asarray(predict(candidatos), dtype=np.float64)
+        avaliacoes += len(candidatos)
+
+        distancias = (np.abs(candidatos - base) / amplitude).sum(axis=1)
+        alcancou = previsoes >= target
+        if alcancou.any():
+            i = np.flatnonzero(alcancou)[np.argmin(distancias[alcancou])]
+            if not melhor['alcancado'] or distancias[i] < melhor['distancia']:
+                melhor.update(valores=candidatos[i], idh=float(previsoes[i]), distancia=float(distancias[i]), alcancado=True)
+        i = np.argmax(previsoes)
+        if previsoes[i] > mais_proximo['idh']:
+            mais_proximo.update(valores=candidatos[i], idh=float(previsoes[i]))
+        return previsoes
+
+    # Fase 1: cada feature sozinha ao longo do slider; dá também o sentido de melhora de cada uma
+    n_pontos = max(2, min(256, batch_size // len(base)))
+    matriz, _ = sweep_matrix(base, bounds, n_pontos)
+    previsoes = avaliar(matriz).reshape(len(base), n_pontos)
+    efeito = previsoes[:, -1] - previsoes[:, 0]
+    direcao_util = np.where(efeito >= 0, 1.0, -1.0)
+
+    # Fases 2 e 3: lotes metade direções aleatórias a partir do município, metade perturbações da melhor solução
+    n_escalas = 32
+    sem_melhora = 0
+    while time.perf_counter() < prazo and avaliacoes < max_evaluations and sem_melhora < patience:
+        anterior = melhor['distancia'] if melhor['alcancado'] else None
+        alcance = melhor['distancia'] if melhor['alcancado'] else float(len(base))
+        n_direcoes = max(1, batch_size // (2 * n_escalas))
+
+        # Direções esparsas (subconjunto aleatório de features), com o sinal que melhora o IDH na maioria dos casos
+        mascara = rng.random((n_direcoes, len(base))) < rng.uniform(0.2, 1.0, (n_direcoes, 1))
+        mascara[np.arange(n_direcoes), rng.integers(len(base), size=n_direcoes)] = True
+        sinais = np.where(rng.random((n_direcoes, len(base))) < 0.85, direcao_util, -direcao_util)
+        direcoes = mascara * sinais * rng.random((n_direcoes, len(base)))
+        direcoes /= np.abs(direcoes).sum(axis=1, keepdims=True)
+        escalas = np.linspace(alcance / n_escalas, alcance, n_escalas)
+        lote = [(base + escalas[:, None, None] * direcoes[None, :, :] * amplitude).reshape(-1, len(base))]
+
+        if melhor['alcancado']:
+            # Aproxima a melhor solução do município e a perturba em poucas features
+            n_local = batch_size - len(lote[0])
+            fator = rng.uniform(0.5, 1.0, (n_local, 1))
+            ruido = rng.normal(0.0, 0.1 * alcance, (n_local, len(base))) * (rng.random((n_local, len(base))) < 0.5)
+            lote.append(base + fator * (melhor['valores'] - base) + ruido * amplitude)
+
+        avaliar(np.vstack(lote))
+        sem_melhora = sem_melhora + 1 if melhor['alcancado'] and melhor['distancia'] == anterior else 0
+
+    # Polimento: uma feature por vez, recuando em direção ao valor do município (todas num só lote)
+    fracoes = np.linspace(0.0, 1.0, 65)
+    for _ in range(2 * len(base)):
+        if not melhor['alcancado']:
+            break
+        distancia = melhor['distancia']
+        alteradas = np.flatnonzero(melhor['valores'] != base)
+        candidatos = np.repeat(melhor['valores'][None, :], len(alteradas) * len(fracoes), axis=0)
+        for k, j in enumerate(alteradas):
+            candidatos[k * len(fracoes):(k + 1) * len(fracoes), j] = base[j] + fracoes * (melhor['valores'][j] - base[j])
+        avaliar(candidatos)
+        if melhor['distancia'] >= distancia:
+            break
+
+    return _resultado(melhor if melhor['alcancado'] else dict(mais_proximo, distancia=float((np.abs(mais_proximo['valores'] - base) / amplitude).sum()), alcancado=False), avaliacoes, inicio)
+
+
+def _resultado(solucao, avaliacoes, inicio):
+    return {
+        'alcancado': bool(solucao['alcancado']),
+        'valores': np.asarray(solucao['valores'], dtype=np.float64),
+        'idh': solucao['idh'],
+        'distancia': solucao['distancia'],
+        'avaliacoes': avaliacoes,
+        'tempo': time.perf_counter() - inicio,
+    }
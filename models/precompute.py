@@ -0,0 +1,96 @@
+# Previsões e resíduos pré-calculados para todos os municípios do dataset.
+# Uso offline: python -m models.precompute [caminho_do_csv]
+import hashlib
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from models.xgb_model import FEATURES, load_trained_model, predict_idh_batch
+from utils.dataset_cache import cache_path, dataset_hash, file_hash, load_dataset
+
+MODEL_PATH = 'models/modelo_idh_xgboost_6vars_scaled.json'
+SCALER_PATH = 'models/scaler_6vars.pkl'
+
+
+def model_hash():
+    return hashlib.sha256((file_hash(MODEL_PATH) + file_hash(SCALER_PATH)).encode()).hexdigest()
+
+
+def _artifact_path(mhash):
+    # Um artefato por versão do modelo; dentro dele, a última versão dos dados
+    return cache_path('predictions', f"{mhash[:16]}.npz")
+
+
+def _row_keys(df):
+    return np.array([f"{estado}|{nome}" for estado, nome in zip(df['estado'], df['nomeLocalidade'])])
+
+
+def _load_artifact(path):
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            return {name: data[name] for name in data.files}
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def _save_artifact(path, **arrays):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp-{os.getpid()}.npz"
+    np.savez(tmp, **arrays)
+    os.replace(tmp, path)
+
+
+def update_predictions(df, data_hash):
+    # Reaproveita previsões de linhas cujas features não mudaram; só o restante vai ao modelo.
+    # Retorna (previsões alinhadas a df, quantidade de linhas recalculadas).
+    path = _artifact_path(model_hash())
+    keys = _row_keys(df)
+    values = df[FEATURES].to_numpy(dtype=np.float64)
+    previous = _load_artifact(path)
+
+    if previous is not None and str(previous['data_hash']) == data_hash and len(previous['predicted']) == len(df):
+        return previous['predicted'], 0
+
+    predicted = np.full(len(df), np.nan, dtype=np.float32)
+    reused = np.zeros(len(df), dtype=bool)
+    if previous is not None:
+        posicao = {key: i for i, key in enumerate(previous['keys'])}
+        anterior = np.array([posicao.get(key, -1) for key in keys])
+        encontrado = anterior >= 0
+        reused[encontrado] = (previous['values'][anterior[encontrado]] == values[encontrado]).all(axis=1)
+        predicted[reused] = previous['predicted'][anterior[reused]]
+
+    stale = ~reused
+    if stale.any():
+        model, scaler, features = load_trained_model()
+        predicted[stale] = predict_idh_batch(model, scaler, features, values[stale])
+
+    try:
+        _save_artifact(path, data_hash=np.array(data_hash), keys=keys, values=values, predicted=predicted)
+    except OSError:
+        pass
+    return predicted, int(stale.sum())
+
+
+def load_predictions(df, data_hash):
+    # Colunas prontas para juntar ao DataFrame (mesmo índice)
+    predicted, _ = update_predictions(df, data_hash)
+    return pd.DataFrame({
+        'IDH Previsto': predicted,
+        'Resíduo': df['IDH'].to_numpy() - predicted,
+    }, index=df.index)
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else 'df_exported.csv'
+    inicio = time.perf_counter()
+    df = load_dataset(path)
+    _, recalculadas = update_predictions(df, dataset_hash(path))
+    print(f"{len(df)} municípios, {recalculadas} previsões recalculadas em {time.perf_counter() - inicio:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
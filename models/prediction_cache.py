@@ -0,0 +1,60 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+class PredictionCache:
+    # Cache LRU de previsões, compartilhado entre sessões (uma instância por processo).
+    # A chave é o vetor de entrada quantizado nos passos dos sliders; cada entrada guarda também a
+    # entrada exata, e só vale como acerto para ela (valores fora do grid nunca recebem a previsão de outro ponto).
+
+    def __init__(self, steps, max_size=8192):
+        self.steps = np.asarray(steps, dtype=np.float64)
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def quantize(self, values):
+        # Índice inteiro no grid de cada slider; evita chaves diferentes por ruído de float
+        return tuple(np.rint(np.asarray(values, dtype=np.float64) / self.steps).astype(np.int64).tolist())
+
+    def get_or_compute(self, values, compute):
+        # compute recebe a entrada exata; o resultado é sempre o da própria entrada
+        exact = tuple(np.asarray(values, dtype=np.float64).tolist())
+        key = self.quantize(exact)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == exact:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        result = compute(np.asarray(exact, dtype=np.float64))
+
+        with self._lock:
+            self._entries[key] = (exact, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return result
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+                'size': len(self._entries),
+                'max_size': self.max_size,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
@@ -0,0 +1,25 @@
+import numpy as np
+import pandas as pd
+
+
+def sweep_matrix(base_values, bounds, n_points=200):
+    # Uma linha por ponto: cada feature varre seu intervalo e as demais ficam no valor base
+    base = np.asarray(base_values, dtype=np.float64)
+    matrix = np.tile(base, (len(base) * n_points, 1))
+    grids = []
+    for i, (minimo, maximo) in enumerate(bounds):
+        grid = np.linspace(minimo, maximo, n_points)
+        matrix[i * n_points:(i + 1) * n_points, i] = grid
+        grids.append(grid)
+    return matrix, grids
+
+
+def response_curves(predict, features, base_values, bounds, n_points=200):
+    # predict recebe a matriz inteira (len(features) * n_points linhas): uma única chamada ao modelo
+    matrix, grids = sweep_matrix(base_values, bounds, n_points)
+    predictions = predict(matrix)
+    return pd.DataFrame({
+        'Indicador': np.repeat(features, n_points),
+        'Valor': np.concatenate(grids),
+        'IDH Previsto': predictions,
+    })
@@ -0,0 +1,104 @@
+import json
+
+import numpy as np
+
+
+def _parse_base_score(value):
+    # Versões recentes do XGBoost gravam o base_score como "[8E-1]"
+    return float(str(value).strip('[]').split(',')[0])
+
+
+def load_forest(path='models/modelo_idh_xgboost_6vars_scaled.json'):
+    # Converte as árvores do modelo JSON em arrays planos para avaliação vetorizada
+    with open(path, encoding='utf-8') as f:
+        learner = json.load(f)['learner']
+
+    # Objetivos de regressão sem função de ligação: a previsão é a soma das folhas mais o base_score
+    if learner['objective']['name'] not in ('reg:squarederror', 'reg:quantileerror'):
+        raise ValueError(f"Objetivo não suportado: {learner['objective']['name']}")
+    trees = learner['gradient_booster']['model']['trees']
+
+    feature, threshold, left, right, default_left, leaf_value, roots = [], [], [], [], [], [], []
+    offset = 0
+    max_depth = 0
+    for tree in trees:
+        if any(tree['split_type']) or tree['categories']:
+            raise ValueError("Splits categóricos não são suportados")
+
+        lc = np.asarray(tree['left_children'], dtype=np.int32)
+        rc = np.asarray(tree['right_children'], dtype=np.int32)
+        cond = np.asarray(tree['split_conditions'], dtype=np.float32)
+        is_leaf = lc == -1
+        own = np.arange(len(lc), dtype=np.int32)
+
+        # Folhas apontam para si mesmas: depois de alcançadas, a travessia não sai delas
+        left.append(np.where(is_leaf, own, lc) + offset)
+        right.append(np.where(is_leaf, own, rc) + offset)
+        feature.append(np.where(is_leaf, 0, tree['split_indices']).astype(np.int32))
+        threshold.append(np.where(is_leaf, np.float32(0), cond))
+        default_left.append(np.asarray(tree['default_left'], dtype=bool))
+        leaf_value.append(np.where(is_leaf, cond, np.float32(0)))
+        roots.append(offset)
+
+        depth = np.zeros(len(lc), dtype=np.int32)
+        for node in range(len(lc)):
+            if not is_leaf[node]:
+                depth[lc[node]] = depth[rc[node]] = depth[node] + 1
+        max_depth = max(max_depth, int(depth.max()))
+        offset += len(lc)
+
+    return {
+        'feature': np.concatenate(feature),
+        'threshold': np.concatenate(threshold),
+        'left': np.concatenate(left),
+        'right': np.concatenate(right),
+        'default_left': np.concatenate(default_left),
+        'leaf_value': np.concatenate(leaf_value),
+        'roots': np.asarray(roots, dtype=np.int32),
+        'max_depth': max_depth,
+        'base_score': _parse_base_score(learner['learner_model_param']['base_score']),
+        'num_feature': int(learner['learner_model_param']['num_feature']),
+    }
+
+
+def leaf_indices(forest, scaled):
+    # Percorre todas as árvores em paralelo, um nível por iteração
+    x = np.asarray(scaled, dtype=np.float32)
+    rows = np.arange(len(x))[:, None]
+    node = np.broadcast_to(forest['roots'], (len(x), len(forest['roots']))).copy()
+    # Sem valores ausentes na entrada (o caso do simulador), o desvio padrão das árvores nunca é consultado
+    has_nan = np.isnan(x).any()
+    for _ in range(forest['max_depth']):
+        value = x[rows, forest['feature'][node]]
+        go_left = value < forest['threshold'][node]
+        if has_nan:
+            go_left = np.where(np.isnan(value), forest['default_left'][node], go_left)
+        node = np.where(go_left, forest['left'][node], forest['right'][node])
+    return node
+
+
+def predict_forest(forest, scaled):
+    # Mesma saída do Booster.predict (reg:squarederror) para entradas já escalonadas
+    leaves = forest['leaf_value'][leaf_indices(forest, scaled)]
+    return (forest['base_score'] + leaves.sum(axis=1, dtype=np.float64)).astype(np.float32)
+
+
+def stack_forests(forests):
+    # Junta vários modelos em uma única floresta (nós com deslocamento); `members` marca onde começam
+    # as árvores de cada um, para que uma só travessia avalie todos
+    offsets = np.cumsum([0] + [len(f['feature']) for f in forests[:-1]])
+    stacked = {key: np.concatenate([f[key] for f in forests]) for key in ['feature', 'threshold', 'default_left', 'leaf_value']}
+    for key in ['left', 'right', 'roots']:
+        stacked[key] = np.concatenate([f[key] + offset for f, offset in zip(forests, offsets)]).astype(np.int32)
+    stacked['members'] = np.cumsum([0] + [len(f['roots']) for f in forests[:-1]]).astype(np.int64)
+    stacked['base_scores'] = np.asarray([f['base_score'] for f in forests], dtype=np.float64)
+    stacked['max_depth'] = max(f['max_depth'] for f in forests)
+    stacked['num_feature'] = forests[0]['num_feature']
+    return stacked
+
+
+def predict_members(stacked, scaled):
+    # Previsão de cada modelo da floresta empilhada: matriz (linhas, modelos)
+    leaves = stacked['leaf_value'][leaf_indices(stacked, scaled)]
+    sums = np.add.reduceat(leaves.astype(np.float64), stacked['members'], axis=1)
+    return (stacked['base_scores'] + sums).astype(np.float32)
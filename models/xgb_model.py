@@ -1,36 +1,94 @@
-import xgboost as xgb
 import pickle
 import numpy as np
-from sklearn.preprocessing import StandardScaler
+import pandas as pd
+from models.tree_eval import load_forest, predict_forest
+from utils.profiling import timed
 
+# Features usadas no modelo, na ordem esperada pelo scaler e pelo booster
+FEATURES = [
+    '% de pobres',
+    'Ativos com Alto Nível Educacional',
+    'Produtividade',
+    'Médicos por milhares de habitantes',
+    'Média Salarial',
+    'PIB Municipal'
+]
+
+# Linhas por bloco na previsão em lote (limita a memória de cada DMatrix)
+DEFAULT_CHUNK_SIZE = 65536
+
+# xgboost (e o sklearn, pelo scaler em pickle) só são importados quando o modelo é carregado,
+# para que páginas que não usam o modelo não paguem esse custo na inicialização
+@timed()
 def load_trained_model():
+    import xgboost as xgb
+
     # Carregar o modelo salvo em formato JSON dentro da pasta models
     model = xgb.Booster()
     model.load_model('models/modelo_idh_xgboost_6vars_scaled.json')  # Caminho atualizado
     
     # Carregar o scaler dentro da pasta models
-    with open('models/scaler_6vars.pkl', 'rb') as f:
-        scaler = pickle.load(f)
+    scaler = load_scaler()
     
     # Definir as features usadas no modelo
-    features = [
-        '% de pobres',
-        'Ativos com Alto Nível Educacional',
-        'Produtividade',
-        'Médicos por milhares de habitantes',
-        'Média Salarial',
-        'PIB Municipal'
-    ]
+    features = list(FEATURES)
     
     return model, scaler, features
 
+def load_scaler():
+    with open('models/scaler_6vars.pkl', 'rb') as f:
+        return pickle.load(f)
+
+def as_feature_matrix(features, input_data):
+    # Aceita DataFrame (colunas pelo nome) ou array NumPy (colunas na ordem de features)
+    if isinstance(input_data, pd.DataFrame):
+        return input_data[features].to_numpy(dtype=np.float64)
+    values = np.asarray(input_data, dtype=np.float64)
+    if values.ndim == 1:
+        values = values.reshape(1, -1)
+    if values.ndim != 2 or values.shape[1] != len(features):
+        raise ValueError(f"Esperado array com {len(features)} colunas ({', '.join(features)}), recebido shape {values.shape}")
+    return values
+
+def scale_features(scaler, values):
+    # Mesmo cálculo do StandardScaler.transform, sem a validação por chamada
+    scaled = values.astype(np.float64, copy=True)
+    if scaler.with_mean:
+        scaled -= scaler.mean_
+    if scaler.with_std:
+        scaled /= scaler.scale_
+    return scaled
+
+@timed()
+def predict_idh_batch(model, scaler, features, input_data, chunk_size=DEFAULT_CHUNK_SIZE):
+    # Previsão vetorizada: uma DMatrix por bloco, saída alinhada às linhas de entrada
+    import xgboost as xgb
+
+    values = as_feature_matrix(features, input_data)
+    predictions = np.empty(len(values), dtype=np.float32)
+    for start in range(0, len(values), chunk_size):
+        stop = start + chunk_size
+        dmatrix = xgb.DMatrix(scale_features(scaler, values[start:stop]), feature_names=features)
+        predictions[start:stop] = model.predict(dmatrix)
+    return predictions
+
+@timed()
 def predict_idh(model, scaler, features, input_data):
     # Garantir que input_data tenha as colunas corretas na ordem esperada
-    input_data_scaled = scaler.transform(input_data[features])
-    dmatrix = xgb.DMatrix(input_data_scaled, feature_names=features)
-    prediction = model.predict(dmatrix)
+    prediction = predict_idh_batch(model, scaler, features, input_data)
     return prediction[0]  # Retorna o valor previsto para o primeiro (e único) registro
 
+@timed()
+def load_fast_model():
+    # Árvores do mesmo modelo JSON, em arrays NumPy para o caminho interativo
+    return load_forest('models/modelo_idh_xgboost_6vars_scaled.json')
+
+@timed()
+def predict_idh_fast(forest, scaler, features, input_data):
+    # Caminho de baixa latência: sem DataFrame nem DMatrix; retorna um array
+    values = as_feature_matrix(features, input_data)
+    return predict_forest(forest, scale_features(scaler, values))
+
 # Função opcional para validação com valores originais (se necessário)
 def validate_with_original_data(model, scaler, features, df):
     original_values = df[features + ['IDH']].copy()
@@ -0,0 +1,17 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+@pytest.fixture(autouse=True, scope='session')
+def raiz_do_repositorio():
+    # O app e os módulos usam caminhos relativos (df_exported.csv, models/, .cache/); por sessão, para
+    # valer também nas fixtures de módulo
+    anterior = os.getcwd()
+    os.chdir(ROOT)
+    yield
+    os.chdir(anterior)
@@ -0,0 +1,62 @@
+import os
+
+from streamlit.testing.v1 import AppTest
+
+from conftest import ROOT
+
+APP_PATH = os.path.join(ROOT, 'app.py')
+
+
+def _detalhes(municipio):
+    at = AppTest.from_file(APP_PATH, default_timeout=120)
+    at.session_state['page'] = 'municipality_detail'
+    at.session_state['selected_municipality'] = municipio
+    return at.run()
+
+
+def test_botao_de_vizinho_abre_municipio_fora_dos_limites_do_simulador():
+    # São Paulo tem PIB acima do máximo dos municípios até 100 mil habitantes
+    at = _detalhes(('Rio de Janeiro', 'Rio de Janeiro'))
+    assert not at.exception
+
+    at.button(key='par_São Paulo_São Paulo').click().run()
+    assert not at.exception
+    assert at.session_state['selected_municipality'] == ('São Paulo', 'São Paulo')
+    assert at.slider(key='pib').value == at.slider(key='pib').max
+
+
+def test_municipio_abaixo_do_minimo_do_simulador():
+    at = _detalhes(('Ceará', 'Parambu'))
+    assert not at.exception
+    assert at.slider(key='media_salarial').min <= at.slider(key='media_salarial').value < 500
+
+
+def _inicio(monkeypatch, debug_env, debug_url):
+    if debug_env:
+        monkeypatch.setenv('IDH_DEBUG', '1')
+    else:
+        monkeypatch.delenv('IDH_DEBUG', raising=False)
+    at = AppTest.from_file(APP_PATH, default_timeout=120)
+    if debug_url:
+        at.query_params['debug'] = '1'
+    return at.run()
+
+
+def test_painel_de_desempenho_nao_abre_pela_url(monkeypatch):
+    at = _inicio(monkeypatch, debug_env=False, debug_url=True)
+    assert not at.exception
+    assert "Zerar métricas" not in [botao.label for botao in at.sidebar.button]
+
+
+def test_painel_de_desempenho_com_idh_debug(monkeypatch):
+    at = _inicio(monkeypatch, debug_env=True, debug_url=False)
+    assert not at.exception
+    assert "Zerar métricas" in [botao.label for botao in at.sidebar.button]
+
+
+def test_meta_abaixo_do_previsto_ja_atingida():
+    at = _detalhes(('Acre', 'Acrelândia'))
+    at.number_input(key='meta_idh').set_value(0.5)
+    at.button[[botao.label for botao in at.button].index("Buscar mudanças mínimas")].click().run()
+    assert not at.exception
+    assert [info.value for info in at.info] == ["O IDH previsto com os valores atuais já atinge a meta."]
@@ -0,0 +1,28 @@
+import math
+
+import pytest
+
+from utils.aggregates import numeric_columns
+from utils.correlations import build_correlations
+from utils.dataset_cache import load_dataset
+
+
+@pytest.fixture(scope='module')
+def df():
+    return load_dataset('df_exported.csv')
+
+
+def _proximos(calculado, esperado):
+    assert calculado.keys() == esperado.keys()
+    for col, valor in esperado.items():
+        assert (math.isnan(valor) and math.isnan(calculado[col])) or calculado[col] == pytest.approx(valor, abs=1e-9)
+
+
+def test_spearman_igual_ao_do_pandas(df):
+    correlacoes = build_correlations(df)
+    cols = [col for col in numeric_columns(df) if col != 'IDH']
+
+    _proximos(correlacoes['nacional'], df[cols].corrwith(df['IDH'], method='spearman').to_dict())
+    for estado, linhas in df.groupby('estado', observed=True):
+        _proximos(correlacoes['estados'][estado], linhas[cols].corrwith(linhas['IDH'], method='spearman').to_dict())
+
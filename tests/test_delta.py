@@ -0,0 +1,147 @@
+import json
+import math
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import ROOT
+from utils import delta
+from utils.aggregates import build_aggregates, load_cached_aggregates, load_or_build_aggregates
+from utils.compact import load_app_dataset
+from utils.correlations import build_correlations, load_cached_correlations, load_or_build_correlations, update_correlations
+from utils.dataset_cache import file_hash, load_dataset
+from utils.diagnostics import diagnostic_tables, load_cached_tables, render_tables
+from utils.figures import CHARTS, _figure_path, warm_all
+from utils.municipality_index import build_index, lookup_row
+from utils.rankings import build_rankings, load_cached_rankings, load_or_build_rankings
+
+
+@pytest.fixture
+def copia(tmp_path, monkeypatch):
+    # Dataset e modelos em um diretório próprio, com .cache/ vazio
+    shutil.copyfile(os.path.join(ROOT, 'df_exported.csv'), tmp_path / 'df_exported.csv')
+    os.symlink(os.path.join(ROOT, 'models'), tmp_path / 'models')
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def _igual(a, b):
+    if isinstance(a, dict):
+        return a.keys() == b.keys() and all(_igual(a[k], b[k]) for k in a)
+    return a == b or (isinstance(a, float) and math.isnan(a) and math.isnan(b))
+
+
+def _delta(tmp_path, nome, **colunas):
+    path = tmp_path / nome
+    pd.DataFrame(colunas).to_csv(path, index=False)
+    return str(path)
+
+
+@pytest.mark.parametrize('colunas, mensagem', [
+    ({'nomeLocalidade': ['Acrelândia'], 'IDH': [0.7]}, 'sem as colunas-chave'),
+    ({'estado': ['Acre'], 'nomeLocalidade': ['Acrelândia'], 'Coluna Nova': [1.0]}, 'Colunas inexistentes'),
+    ({'estado': ['Acre', 'Acre'], 'nomeLocalidade': ['Acrelândia', 'Acrelândia'], 'IDH': [0.7, 0.71]}, 'repetidos'),
+    ({'estado': ['Bahia'], 'nomeLocalidade': ['Inexistente'], 'IDH': [0.5]}, 'não encontrados'),
+])
+def test_erros_de_validacao(tmp_path, colunas, mensagem):
+    df = load_dataset(os.path.join(ROOT, 'df_exported.csv'))
+    with pytest.raises(ValueError, match=mensagem):
+        delta.apply_delta(df, delta.read_delta(_delta(tmp_path, 'delta.csv', **colunas)))
+
+
+def test_celulas_vazias_e_valores_iguais_nao_alteram(tmp_path):
+    df = load_dataset(os.path.join(ROOT, 'df_exported.csv'))
+    linha = lookup_row(df, build_index(df), 'Acre', 'Brasiléia')
+    path = _delta(tmp_path, 'delta.csv', estado=['Acre', 'Acre'], nomeLocalidade=['Acrelândia', 'Brasiléia'],
+                  IDH=[None, linha['IDH']], **{'Média Salarial': [2100.5, None]})
+    novo, posicoes, estados, colunas = delta.apply_delta(df, delta.read_delta(path))
+
+    assert colunas == ['Média Salarial'] and estados == ['Acre'] and len(posicoes) == 1
+    assert novo.iloc[posicoes[0]]['Média Salarial'] == 2100.5
+    outras = np.ones(len(df), dtype=bool)
+    outras[posicoes] = False
+    assert novo[outras].equals(df[outras])
+
+
+def test_correlacoes_atualizadas_iguais_ao_calculo_completo():
+    df = load_dataset(os.path.join(ROOT, 'df_exported.csv'))
+    anterior = build_correlations(df)
+    novo = df.copy()
+    alvo = novo['estado'] == 'Acre'
+    novo.loc[alvo, 'IDH'] = novo.loc[alvo, 'IDH'][::-1].to_numpy()
+
+    atualizado, completo = update_correlations(anterior, novo, ['Acre']), build_correlations(novo)
+    for calculado, esperado in [(atualizado['nacional'], completo['nacional'])] + [(atualizado['estados'][e], completo['estados'][e]) for e in completo['estados']]:
+        assert calculado.keys() == esperado.keys()
+        for col, valor in esperado.items():
+            assert (math.isnan(valor) and math.isnan(calculado[col])) or calculado[col] == pytest.approx(valor, abs=1e-9)
+
+
+def test_incremental_igual_a_reconstrucao(copia):
+    # Artefatos da versão anterior, como o app os deixa em cache
+    df, old_hash = load_app_dataset('df_exported.csv'), file_hash('df_exported.csv')
+    index = build_index(df)
+    load_or_build_aggregates(df, old_hash, 'compacto')
+    load_or_build_rankings(df, old_hash)
+    load_or_build_correlations(df[df['População residente'] <= 100000], old_hash, scope='ate100k')
+    warm_all(df, index, old_hash)
+    amostra = [('Acre', 'Acrelândia'), ('Bahia', 'Salvador'), ('Ceará', 'Crato')]
+
+    # Só colunas fora das tabelas de diagnóstico e dos gráficos: tudo o que não mudou é reaproveitado
+    path = _delta(copia, 'delta.csv', estado=['Bahia', 'Ceará'], nomeLocalidade=['Salvador', 'Fortaleza'],
+                  **{'Densidade demográfica': [123.4, 99.9], 'População residente': [2400000, 2600000]})
+    aggregates = load_cached_aggregates(old_hash, 'compacto')
+    correlations = load_cached_correlations(old_hash, 'ate100k')
+    for chave in amostra:
+        diagnostic_tables(old_hash, lookup_row(df, index, *chave), aggregates, correlations)
+
+    delta.main([path, '--sem-diagnosticos'])
+    novo, data_hash = load_app_dataset('df_exported.csv'), file_hash('df_exported.csv')
+    assert data_hash != old_hash
+    assert not [nome for nome in os.listdir(copia) if '.novo-' in nome]
+    assert os.path.exists(os.path.join('.cache', 'versions', f"{old_hash[:16]}.csv"))
+
+    ate100k = novo[novo['População residente'] <= 100000]
+    assert _igual(load_cached_aggregates(data_hash, 'compacto'), json.loads(json.dumps(build_aggregates(novo))))
+    assert _igual(load_cached_correlations(data_hash, 'ate100k'), json.loads(json.dumps(build_correlations(ate100k))))
+    incremental, completo = load_cached_rankings(data_hash), build_rankings(novo)
+    assert all(np.array_equal(incremental['nacional'][col], completo['nacional'][col]) for col in completo['nacional'])
+    assert all(np.array_equal(incremental['estados'][e][col], completo['estados'][e][col]) for e in completo['estados'] for col in completo['estados'][e])
+
+    # Figuras copiadas da versão anterior iguais às que seriam geradas agora
+    copiadas = {}
+    novo_index = build_index(novo)
+    for chart, (_, por_estado) in CHARTS.items():
+        for estado in (novo_index['states'] if por_estado else [None]):
+            with open(_figure_path(data_hash, chart, estado), encoding='utf-8') as f:
+                copiadas[(chart, estado)] = f.read()
+    shutil.rmtree(os.path.dirname(_figure_path(data_hash, 'idh_por_estado')))
+    warm_all(novo, novo_index, data_hash)
+    for (chart, estado), spec in copiadas.items():
+        with open(_figure_path(data_hash, chart, estado), encoding='utf-8') as f:
+            assert f.read() == spec
+
+    # Tabelas reaproveitadas (e a do município alterado, ausente) iguais a uma renderização nova
+    novos_agregados = load_cached_aggregates(data_hash, 'compacto')
+    novas_correlacoes = load_cached_correlations(data_hash, 'ate100k')
+    for chave in amostra:
+        mun = lookup_row(novo, novo_index, *chave)
+        em_cache = load_cached_tables(data_hash, *chave)
+        assert em_cache is None if chave == ('Bahia', 'Salvador') else em_cache == render_tables(mun, novos_agregados, novas_correlacoes)
+
+
+def test_falha_nos_artefatos_nao_troca_o_csv(copia, monkeypatch):
+    antes = file_hash('df_exported.csv')
+
+    def falhar(*args, **kwargs):
+        raise RuntimeError('falha simulada')
+    monkeypatch.setattr(delta, 'refresh_artifacts', falhar)
+
+    path = _delta(copia, 'delta.csv', estado=['Acre'], nomeLocalidade=['Acrelândia'], IDH=[0.7])
+    with pytest.raises(RuntimeError):
+        delta.main([path, '--sem-diagnosticos'])
+    assert file_hash('df_exported.csv') == antes
+    assert not [nome for nome in os.listdir(copia) if '.novo-' in nome]
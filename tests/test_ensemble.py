@@ -0,0 +1,75 @@
+import json
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+from models.ensemble import BAND_PERCENTILES, ENSEMBLE_DIR, build_ensemble, load_ensemble, predict_band
+from models.tree_eval import load_forest, predict_forest, predict_members, stack_forests
+from models.xgb_model import FEATURES, load_fast_model, load_scaler, predict_idh_fast, scale_features
+from utils.dataset_cache import load_dataset
+
+
+@pytest.fixture(scope='module')
+def modelo():
+    return load_fast_model(), load_scaler(), load_dataset('df_exported.csv')
+
+
+def test_quantis_versionados_valem_para_o_modelo_atual(modelo):
+    forest, _, _ = modelo
+    assert load_ensemble(forest) is not None
+
+
+def test_floresta_empilhada_avalia_cada_modelo(modelo):
+    forest, scaler, df = modelo
+    quantil = load_forest(os.path.join(ENSEMBLE_DIR, f"quantil_{BAND_PERCENTILES[0]:02d}.json"))
+    scaled = scale_features(scaler, df[FEATURES].iloc[:50].to_numpy(dtype=np.float64))
+    previsoes = predict_members(stack_forests([forest, quantil, forest]), scaled)
+    for coluna, modelo_coluna in enumerate([forest, quantil, forest]):
+        np.testing.assert_allclose(previsoes[:, coluna], predict_forest(modelo_coluna, scaled), rtol=0, atol=1e-6)
+
+
+def test_quantis_iguais_ao_booster(modelo):
+    import xgboost as xgb
+
+    _, scaler, df = modelo
+    scaled = scale_features(scaler, df[FEATURES].to_numpy(dtype=np.float64))
+    for percentil in BAND_PERCENTILES:
+        path = os.path.join(ENSEMBLE_DIR, f"quantil_{percentil:02d}.json")
+        booster = xgb.Booster()
+        booster.load_model(path)
+        esperado = booster.predict(xgb.DMatrix(scaled, feature_names=list(FEATURES)))
+        np.testing.assert_allclose(predict_forest(load_forest(path), scaled), esperado, rtol=0, atol=1e-6)
+
+
+def test_faixa_contem_a_previsao_pontual(modelo):
+    forest, scaler, df = modelo
+    valores = df[FEATURES].to_numpy(dtype=np.float64)
+    previsto, inferior, superior = predict_band(load_ensemble(forest), scaler, FEATURES, valores)
+
+    np.testing.assert_array_equal(previsto, predict_idh_fast(forest, scaler, FEATURES, valores))
+    assert (inferior <= superior).all()
+    assert np.mean((previsto >= inferior) & (previsto <= superior)) > 0.99
+
+
+def test_treino_recusa_sem_parametros(tmp_path, modelo):
+    _, _, df = modelo
+    with pytest.raises(ValueError, match='Parâmetros de treino ausentes'):
+        build_ensemble(df, str(tmp_path))
+
+    with open(tmp_path / 'params.json', 'w', encoding='utf-8') as f:
+        json.dump({'rodadas': 10}, f)
+    with pytest.raises(ValueError, match='falta parametros'):
+        build_ensemble(df, str(tmp_path))
+
+
+def test_treino_reproduz_os_quantis_versionados(tmp_path, modelo):
+    _, _, df = modelo
+    shutil.copyfile(os.path.join(ENSEMBLE_DIR, 'params.json'), tmp_path / 'params.json')
+    build_ensemble(df, str(tmp_path))
+    for percentil in BAND_PERCENTILES:
+        nome = f"quantil_{percentil:02d}.json"
+        novo, versionado = load_forest(str(tmp_path / nome)), load_forest(os.path.join(ENSEMBLE_DIR, nome))
+        for key in ['feature', 'threshold', 'leaf_value']:
+            np.testing.assert_array_equal(novo[key], versionado[key])
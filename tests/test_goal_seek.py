@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+
+from models.goal_seek import goal_seek
+from models.xgb_model import FEATURES, load_fast_model, load_scaler, predict_idh_fast
+from utils.dataset_cache import load_dataset
+
+
+@pytest.fixture(scope='module')
+def cenario():
+    forest, scaler = load_fast_model(), load_scaler()
+    df = load_dataset('df_exported.csv')
+    base = df[FEATURES].iloc[0].to_numpy(dtype=np.float64)
+    bounds = [(min(df[f].min(), v), max(df[f].max(), v)) for f, v in zip(FEATURES, base)]
+    steps = [(high - low) / 1000 for low, high in bounds]
+    predict = lambda matriz: predict_idh_fast(forest, scaler, FEATURES, matriz)
+    return predict, base, bounds, steps, float(predict(base)[0])
+
+
+def test_meta_abaixo_da_previsao_atual_ja_esta_atingida(cenario):
+    predict, base, bounds, steps, atual = cenario
+    resultado = goal_seek(predict, base, bounds, atual - 0.05, steps)
+
+    assert resultado['alcancado'] and resultado['avaliacoes'] == 1
+    assert resultado['distancia'] == 0.0 and resultado['idh'] == atual
+    np.testing.assert_array_equal(resultado['valores'], base)
+
+
+def test_meta_acima_da_previsao_atual(cenario):
+    predict, base, bounds, steps, atual = cenario
+    resultado = goal_seek(predict, base, bounds, atual + 0.02, steps, time_budget=0.3)
+
+    assert resultado['alcancado'] and resultado['distancia'] > 0
+    assert resultado['idh'] >= atual + 0.02
+    assert float(predict(resultado['valores'])[0]) == pytest.approx(resultado['idh'], abs=1e-6)
@@ -0,0 +1,9 @@
+from benchmarks.import_report import app_modules
+
+
+def test_modulos_do_app_lidos_do_codigo():
+    modulos = app_modules()
+    for modulo in ['models.goal_seek', 'models.ensemble', 'utils.compact', 'utils.shared_dataset', 'utils.peers', 'utils.figures']:
+        assert modulo in modulos
+    # Importados só dentro das páginas
+    assert not [modulo for modulo in modulos if modulo.split('.')[0] in ('plotly', 'streamlit_extras', 'xgboost', 'sklearn')]
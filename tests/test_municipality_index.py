@@ -0,0 +1,17 @@
+import pandas as pd
+import pytest
+
+from utils.municipality_index import build_index, lookup_row, state_rows
+
+
+def test_chave_por_estado_e_nome():
+    df = pd.DataFrame({'estado': ['Bahia', 'Bahia', 'Piauí'], 'nomeLocalidade': ['Alto', 'Baixo', 'Alto'], 'IDH': [0.6, 0.7, 0.8]})
+    index = build_index(df)
+    assert lookup_row(df, index, 'Piauí', 'Alto')['IDH'] == 0.8
+    assert state_rows(df, index, 'Bahia')['nomeLocalidade'].tolist() == ['Alto', 'Baixo']
+
+
+def test_chave_repetida_e_erro():
+    df = pd.DataFrame({'estado': ['Bahia', 'Piauí', 'Bahia', 'Bahia'], 'nomeLocalidade': ['Alto', 'Alto', 'Alto', 'Alto'], 'IDH': [0.6, 0.7, 0.8, 0.9]})
+    with pytest.raises(ValueError, match=r'Municípios repetidos no dataset: Alto \(Bahia\)$'):
+        build_index(df)
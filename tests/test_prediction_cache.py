@@ -0,0 +1,45 @@
+import pytest
+
+from models.prediction_cache import PredictionCache
+from models.xgb_model import FEATURES, load_fast_model, load_scaler, predict_idh_fast
+
+PASSOS = [0.1, 0.1, 100.0, 0.001, 50.0, 1000.0]
+
+
+@pytest.fixture(scope='module')
+def modelo():
+    return load_fast_model(), load_scaler()
+
+
+def _prever(modelo):
+    forest, scaler = modelo
+    return lambda valores: float(predict_idh_fast(forest, scaler, FEATURES, valores)[0])
+
+
+def test_entrada_fora_do_grid_usa_o_valor_exato(modelo):
+    cache = PredictionCache(PASSOS)
+    valores = [37.43, 8.04, 14731.75, 0.137, 1183.21, 190633284.14]
+    esperado = _prever(modelo)(valores)
+
+    assert cache.get_or_compute(valores, _prever(modelo)) == esperado
+    assert cache.get_or_compute(valores, _prever(modelo)) == esperado
+    assert cache.stats()['hits'] == 1
+
+
+def test_mesma_celula_do_grid_nao_reaproveita_outra_entrada(modelo):
+    cache = PredictionCache(PASSOS)
+    a = [37.43, 8.04, 14731.75, 0.137, 1183.21, 190633284.14]
+    b = [37.41, 8.04, 14731.75, 0.137, 1183.21, 190633284.14]
+    assert cache.quantize(a) == cache.quantize(b)
+
+    cache.get_or_compute(a, _prever(modelo))
+    assert cache.get_or_compute(b, _prever(modelo)) == _prever(modelo)(b)
+    assert cache.stats()['hits'] == 0
+
+
+def test_limite_de_tamanho():
+    cache = PredictionCache([1.0], max_size=2)
+    for valor in [1.0, 2.0, 3.0]:
+        cache.get_or_compute([valor], lambda v: float(v[0]))
+    assert cache.stats()['size'] == 2
+    assert cache.get_or_compute([1.0], lambda v: -1.0) == -1.0
@@ -0,0 +1,48 @@
+import os
+import time
+
+from utils import shared_dataset
+from utils.shared_dataset import SEGMENT_VERSION, remove_superseded, segment_dir
+
+
+def _segmento(base, data_hash, model_hash='b' * 64, compact=True, versao=SEGMENT_VERSION, idade=0):
+    caminho = segment_dir(str(base), data_hash, model_hash, compact)
+    caminho = caminho[:caminho.rindex('-v')] + f"-v{versao}"
+    os.makedirs(caminho)
+    with open(os.path.join(caminho, 'manifest.json'), 'w') as f:
+        f.write('{}')
+    instante = time.time() - idade
+    os.utime(caminho, (instante, instante))
+    return caminho
+
+
+def test_remove_so_segmentos_substituidos(tmp_path):
+    target = _segmento(tmp_path, 'a' * 64)
+    anterior = _segmento(tmp_path, 'c' * 64, idade=60)
+    formato_antigo = _segmento(tmp_path, 'a' * 64, model_hash='d' * 64, versao=SEGMENT_VERSION - 1)
+    mais_novo = _segmento(tmp_path, 'e' * 64, idade=-60)
+    formato_novo = _segmento(tmp_path, 'f' * 64, versao=SEGMENT_VERSION + 1, idade=60)
+    outra_variante = _segmento(tmp_path, 'c' * 64, compact=False, idade=60)
+    em_publicacao = f"{segment_dir(str(tmp_path), '1' * 64, 'b' * 64)}.tmp-123"
+    os.makedirs(em_publicacao)
+    alheio = tmp_path / 'outros-dados'
+    alheio.mkdir()
+    os.utime(alheio, (0, 0))
+
+    assert sorted(remove_superseded(target)) == sorted([anterior, formato_antigo])
+    for caminho in [target, mais_novo, formato_novo, outra_variante, em_publicacao, alheio]:
+        assert os.path.isdir(caminho)
+
+
+def test_segmento_removido_durante_a_leitura_e_republicado(tmp_path, monkeypatch):
+    chamadas = []
+
+    def attach(target):
+        chamadas.append(target)
+        if len(chamadas) == 1:
+            raise FileNotFoundError(target)
+        return {'target': target}
+    monkeypatch.setattr(shared_dataset, 'attach', attach)
+    monkeypatch.setattr(shared_dataset, 'publish_current', lambda base_dir, path, compact: os.path.join(base_dir, 'novo'))
+
+    assert shared_dataset.attach_or_publish(str(tmp_path)) == {'target': os.path.join(str(tmp_path), 'novo')}
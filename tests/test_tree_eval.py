@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+
+from models.tree_eval import predict_forest
+from models.xgb_model import load_fast_model, load_trained_model, predict_idh_batch, predict_idh_fast, scale_features
+from utils.dataset_cache import load_dataset
+
+
+@pytest.fixture(scope='module')
+def modelo():
+    model, scaler, features = load_trained_model()
+    return model, load_fast_model(), scaler, features, load_dataset('df_exported.csv')
+
+
+def test_floresta_igual_ao_booster_em_todo_o_dataset(modelo):
+    model, forest, scaler, features, df = modelo
+    valores = df[features].to_numpy(dtype=np.float64)
+    np.testing.assert_allclose(predict_idh_fast(forest, scaler, features, valores), predict_idh_batch(model, scaler, features, valores), rtol=0, atol=1e-6)
+
+
+def test_valores_ausentes_seguem_o_desvio_padrao_das_arvores(modelo):
+    import xgboost as xgb
+
+    model, forest, scaler, features, df = modelo
+    scaled = scale_features(scaler, df[features].iloc[:200].to_numpy(dtype=np.float64))
+    scaled[np.arange(200), np.arange(200) % len(features)] = np.nan
+    esperado = model.predict(xgb.DMatrix(scaled, feature_names=features))
+    np.testing.assert_allclose(predict_forest(forest, scaled), esperado, rtol=0, atol=1e-6)
+
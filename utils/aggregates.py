@@ -0,0 +1,99 @@
+import json
+import os
+
+from utils.dataset_cache import cache_path
+
+# Estatísticas pré-calculadas para cada coluna numérica
+STATS = ['count', 'sum', 'mean', 'median', 'std', 'min', 'q25', 'q75', 'max']
+
+# Colunas numéricas que não são indicadores
+IGNORED_COLUMNS = ['Unnamed: 0']
+
+
+def numeric_columns(df):
+    return [col for col in df.select_dtypes('number').columns if col not in IGNORED_COLUMNS]
+
+
+def _float64(frame):
+    # Colunas float32 (dataset compacto) acumuladas em float64, como as demais
+    return frame.astype({col: 'float64' for col, dtype in frame.dtypes.items() if dtype == 'float32'})
+
+
+def _compute(frame_or_groups):
+    # Nove reduções, cada uma vetorizada sobre todas as colunas (e todos os grupos); um único
+    # groupby().agg([...]) ficaria bem mais lento, porque os quartis só entram nele como funções Python
+    return {
+        'count': frame_or_groups.count(),
+        'sum': frame_or_groups.sum(),
+        'mean': frame_or_groups.mean(),
+        'median': frame_or_groups.median(),
+        'std': frame_or_groups.std(),
+        'min': frame_or_groups.min(),
+        'q25': frame_or_groups.quantile(0.25),
+        'q75': frame_or_groups.quantile(0.75),
+        'max': frame_or_groups.max(),
+    }
+
+
+def build_state_aggregates(df, estados=None):
+    # Um só groupby para todos os estados, reduzido uma vez por estatística
+    cols = numeric_columns(df)
+    if estados is not None:
+        df = df[df['estado'].isin(estados)]
+    por_estado = _compute(_float64(df[cols]).groupby(df['estado'], observed=True))
+
+    resultado = {}
+    for stat, tabela in por_estado.items():
+        for estado, linha in tabela.iterrows():
+            resultado.setdefault(estado, {})[stat] = linha.to_dict()
+    return resultado
+
+
+def build_aggregates(df):
+    # Estrutura: {'nacional': {stat: {coluna: valor}}, 'estados': {estado: {stat: {coluna: valor}}}}
+    cols = numeric_columns(df)
+    nacional = {stat: serie.to_dict() for stat, serie in _compute(_float64(df[cols])).items()}
+    return {'nacional': nacional, 'estados': build_state_aggregates(df)}
+
+
+def update_aggregates(previous, df, estados):
+    # Após uma atualização parcial: nacional recalculado, estaduais só dos estados alterados
+    cols = numeric_columns(df)
+    nacional = {stat: serie.to_dict() for stat, serie in _compute(_float64(df[cols])).items()}
+    por_estado = dict(previous['estados'])
+    por_estado.update(build_state_aggregates(df, estados))
+    return {'nacional': nacional, 'estados': por_estado}
+
+
+def _aggregates_path(data_hash, scope):
+    return cache_path('aggregates', f"{data_hash[:16]}-{scope}.json")
+
+
+def store_aggregates(aggregates, data_hash, scope='todos'):
+    path = _aggregates_path(data_hash, scope)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.tmp-{os.getpid()}"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(aggregates, f, ensure_ascii=False)
+        os.replace(tmp, path)
+    except OSError:
+        pass
+
+
+def load_cached_aggregates(data_hash, scope='todos'):
+    try:
+        with open(_aggregates_path(data_hash, scope), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def load_or_build_aggregates(df, data_hash, scope='todos'):
+    # Persistido por hash do dataset e recorte (o modo compacto acumula float32 e difere na última casa)
+    aggregates = load_cached_aggregates(data_hash, scope)
+    if aggregates is None:
+        aggregates = build_aggregates(df)
+        store_aggregates(aggregates, data_hash, scope)
+    return aggregates
+
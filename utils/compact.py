@@ -0,0 +1,126 @@
+import sys
+
+import numpy as np
+import pandas as pd
+
+# Colunas mantidas em float64: entradas do modelo, o IDH e os indicadores exibidos com arredondamento
+# (em float32, valores como 0.15 arredondariam para cima e mudariam o texto exibido)
+FLOAT64_COLUMNS = [
+    'IDH',
+    '% de pobres',
+    'Ativos com Alto Nível Educacional',
+    'Ativos com Médio Nível Educacional',
+    'Ativos com Baixo Nível Educacional',
+    'Produtividade',
+    'Médicos por milhares de habitantes',
+    'Hospitais por milhares de habitantes',
+    'Taxa de Saneamento Básico',
+    'Média Salarial',
+    'PIB Municipal',
+]
+
+# Candidatas a categoria; só convertidas quando há repetição suficiente (nomes de município são quase
+# todos distintos e ocupariam mais espaço como categoria)
+CATEGORY_COLUMNS = ['estado', 'nomeLocalidade']
+MAX_UNIQUE_RATIO = 0.5
+
+# Faixas de IDH, com limite inferior inclusivo
+IDH_BINS = [-np.inf, 0.5, 0.8, 0.9, np.inf]
+IDH_LABELS = ['IDH Baixo', 'IDH Médio', 'IDH Alto', 'IDH Muito Alto']
+
+
+def classify_idh(idh):
+    # Classificação vetorizada: um código por linha em vez de uma string por linha
+    return pd.cut(idh, bins=IDH_BINS, labels=IDH_LABELS, right=False)
+
+
+def _decimals(values, max_decimals=6):
+    # Menor número de casas decimais que representa todos os valores (None se nenhum até max_decimals)
+    for casas in range(max_decimals + 1):
+        if np.array_equal(np.round(values, casas), values):
+            return casas
+    return None
+
+
+def _fits_float32(values):
+    # float32 só quando, arredondado às casas decimais do dado, reproduz exatamente o float64 original
+    finitos = values[np.isfinite(values)]
+    casas = _decimals(finitos)
+    if casas is None:
+        return False
+    return np.array_equal(np.round(finitos.astype(np.float32).astype(np.float64), casas), finitos)
+
+
+def compact_dtypes(df):
+    # Tipo de destino por coluna; colunas ausentes do dicionário ficam como estão
+    tipos = {}
+    for col in df.columns:
+        values = df[col].to_numpy()
+        if col in CATEGORY_COLUMNS:
+            if df[col].nunique() <= MAX_UNIQUE_RATIO * len(df):
+                tipos[col] = 'category'
+        elif values.dtype.kind in 'iu' and len(values) and np.iinfo(np.int32).min <= values.min() and values.max() <= np.iinfo(np.int32).max:
+            tipos[col] = np.int32
+        elif values.dtype == np.float64 and col not in FLOAT64_COLUMNS and _fits_float32(values):
+            tipos[col] = np.float32
+    return tipos
+
+
+def compact_dataset(df):
+    return df.astype(compact_dtypes(df))
+
+
+def app_dataset(df, compact=True):
+    # Dataset como o app o usa: tipos compactos (opcional) e a faixa de IDH de cada município
+    if compact:
+        df = compact_dataset(df)
+    return df.assign(classificacao_idh=classify_idh(df['IDH']))
+
+
+def load_app_dataset_version(path='df_exported.csv', compact=True):
+    # (dataset do app, hash do CSV de onde ele veio)
+    from utils.dataset_cache import load_dataset_version
+
+    df, data_hash = load_dataset_version(path)
+    return app_dataset(df, compact), data_hash
+
+
+def load_app_dataset(path='df_exported.csv', compact=True):
+    return load_app_dataset_version(path, compact)[0]
+
+
+def memory_usage(df):
+    return int(df.memory_usage(deep=True).sum())
+
+
+def memory_report(df):
+    # Memória do dataset como usado pelo app, antes (tipos do CSV + classificação em strings) e depois
+    antes = df.assign(classificacao_idh=classify_idh(df['IDH']).astype(object))
+    compacto = compact_dataset(df)
+    depois = compacto.assign(classificacao_idh=classify_idh(compacto['IDH']))
+
+    por_coluna = pd.DataFrame({
+        'antes': antes.memory_usage(deep=True, index=False),
+        'depois': depois.memory_usage(deep=True, index=False),
+        'tipo_antes': antes.dtypes.astype(str),
+        'tipo_depois': depois.dtypes.astype(str),
+    })
+    por_coluna['economia'] = por_coluna['antes'] - por_coluna['depois']
+    return {'antes': memory_usage(antes), 'depois': memory_usage(depois), 'colunas': por_coluna.sort_values('economia', ascending=False)}
+
+
+def main(argv=None):
+    from utils.dataset_cache import load_dataset
+
+    argv = sys.argv[1:] if argv is None else argv
+    path = argv[0] if argv else 'df_exported.csv'
+    relatorio = memory_report(load_dataset(path))
+
+    colunas = relatorio['colunas']
+    print(colunas[colunas['economia'] != 0].to_string())
+    antes, depois = relatorio['antes'], relatorio['depois']
+    print(f"\nDataset por processo: {antes / 1e6:.2f} MB -> {depois / 1e6:.2f} MB ({1 - depois / antes:.0%} menor)")
+
+
+if __name__ == '__main__':
+    main()
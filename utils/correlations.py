@@ -0,0 +1,86 @@
+import json
+import os
+
+import numpy as np
+
+from utils.aggregates import numeric_columns
+from utils.dataset_cache import cache_path
+
+
+def _spearman_national(ranks, cols, target):
+    # Pearson sobre os postos: colunas centradas e normalizadas, um único produto matricial
+    matriz = ranks[cols + [target]].to_numpy(dtype=np.float64, copy=True)
+    matriz -= matriz.mean(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        matriz /= np.sqrt((matriz ** 2).sum(axis=0))
+        corr = matriz[:, :-1].T @ matriz[:, -1]
+    return dict(zip(cols, corr.tolist()))
+
+
+def _spearman_by_state(df, cols, target):
+    # Postos calculados dentro de cada estado de uma só vez; as somas por grupo fazem o papel do produto
+    grupos = df['estado']
+    ranks = df.groupby(grupos, observed=True)[cols + [target]].rank()
+    centrado = ranks - ranks.groupby(grupos, observed=True).transform('mean')
+    alvo = centrado[target].to_numpy()
+
+    numerador = centrado[cols].mul(alvo, axis=0).groupby(grupos, observed=True).sum()
+    variancia = (centrado[cols] ** 2).groupby(grupos, observed=True).sum()
+    variancia_alvo = (centrado[target] ** 2).groupby(grupos, observed=True).sum()
+    with np.errstate(invalid='ignore', divide='ignore'):
+        corr = numerador / np.sqrt(variancia.mul(variancia_alvo, axis=0))
+
+    return {estado: linha.to_dict() for estado, linha in corr.iterrows()}
+
+
+def build_correlations(df, target='IDH'):
+    # Estrutura: {'nacional': {coluna: rho}, 'estados': {estado: {coluna: rho}}}
+    cols = [col for col in numeric_columns(df) if col != target]
+    return {
+        'nacional': _spearman_national(df[cols + [target]].rank(), cols, target),
+        'estados': _spearman_by_state(df, cols, target),
+    }
+
+
+def update_correlations(previous, df, estados, target='IDH'):
+    # Após uma atualização parcial: nacional recalculado (os postos são globais), estaduais só dos estados alterados
+    cols = [col for col in numeric_columns(df) if col != target]
+    por_estado = dict(previous['estados'])
+    por_estado.update(_spearman_by_state(df[df['estado'].isin(estados)], cols, target))
+    return {
+        'nacional': _spearman_national(df[cols + [target]].rank(), cols, target),
+        'estados': por_estado,
+    }
+
+
+def _correlations_path(data_hash, scope, target):
+    return cache_path('correlations', f"{data_hash[:16]}-{scope}-{target}.json")
+
+
+def store_correlations(correlations, data_hash, scope='todos', target='IDH'):
+    path = _correlations_path(data_hash, scope, target)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.tmp-{os.getpid()}"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(correlations, f, ensure_ascii=False)
+        os.replace(tmp, path)
+    except OSError:
+        pass
+
+
+def load_cached_correlations(data_hash, scope='todos', target='IDH'):
+    try:
+        with open(_correlations_path(data_hash, scope, target), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def load_or_build_correlations(df, data_hash, scope='todos', target='IDH'):
+    # Resultado persistido por hash do dataset (e recorte usado): só é recalculado quando os dados mudam
+    correlations = load_cached_correlations(data_hash, scope, target)
+    if correlations is None:
+        correlations = build_correlations(df, target)
+        store_correlations(correlations, data_hash, scope, target)
+    return correlations
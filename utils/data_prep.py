@@ -1,15 +1,19 @@
-import pandas as pd
-import streamlit as st
+from utils.dataset_cache import load_dataset
+from utils.municipality_index import lookup_row
+from utils.profiling import timed
 
+@timed()
 def load_and_filter_data(path):
-    # Carregar dados
-    df = pd.read_csv(path)
+    # Carregar dados (via cache colunar binário)
+    df = load_dataset(path)
     
-    # Filtrar municípios até 100k habitantes e criar uma cópia
-    df_filtered = df[df['População residente'] <= 100000].copy()
+    # Filtrar municípios até 100k habitantes (a seleção por máscara já é independente do df original)
+    df_filtered = df[df['População residente'] <= 100000]
     
     return df_filtered
 
-@st.cache_data
-def get_municipality_data(df, municipality):
-    return df[df['nomeLocalidade'] == municipality].iloc[0]
\ No newline at end of file
+@timed()
+def get_municipality_data(df, index, municipality):
+    # municipality é a chave (estado, nomeLocalidade); busca O(1) pelo índice
+    estado, nome = municipality
+    return lookup_row(df, index, estado, nome)
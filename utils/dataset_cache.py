@@ -0,0 +1,118 @@
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+# Diretório dos artefatos gerados a partir do CSV (não versionado)
+CACHE_DIR = '.cache'
+
+_MANIFEST = 'manifest.json'
+_hash_memo = {}
+
+
+def file_hash(path):
+    # Hash de conteúdo (sha256); memorizado por tamanho e data de modificação
+    stat = os.stat(path)
+    memo_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    if memo_key in _hash_memo:
+        return _hash_memo[memo_key]
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for bloco in iter(lambda: f.read(1 << 20), b''):
+            digest.update(bloco)
+    _hash_memo[memo_key] = digest.hexdigest()
+    return _hash_memo[memo_key]
+
+
+def dataset_hash(path='df_exported.csv'):
+    return file_hash(path)
+
+
+def cache_path(*parts):
+    return os.path.join(CACHE_DIR, *parts)
+
+
+def _dataset_dir(data_hash):
+    return cache_path('dataset', data_hash[:16])
+
+
+def _write_columns(df, data_hash, target):
+    # Grava cada coluna como um arquivo .npy tipado (strings em unicode de largura fixa)
+    tmp = f"{target}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+
+    columns = []
+    for i, name in enumerate(df.columns):
+        values = df[name].to_numpy()
+        kind = 'numeric'
+        if values.dtype.kind not in 'biuf':
+            values = values.astype(str)
+            kind = 'string'
+        filename = f"col_{i:03d}.npy"
+        np.save(os.path.join(tmp, filename), values, allow_pickle=False)
+        columns.append({'name': name, 'file': filename, 'kind': kind, 'dtype': values.dtype.str})
+
+    manifest = {'hash': data_hash, 'rows': len(df), 'columns': columns}
+    with open(os.path.join(tmp, _MANIFEST), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False)
+
+    # Troca atômica: outro processo nunca enxerga um diretório pela metade
+    try:
+        os.rename(tmp, target)
+    except OSError:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def _read_columns(target, data_hash):
+    manifest_path = os.path.join(target, _MANIFEST)
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path, encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get('hash') != data_hash:
+        return None
+
+    data = {}
+    for col in manifest['columns']:
+        values = np.load(os.path.join(target, col['file']), mmap_mode='r', allow_pickle=False)
+        if col['kind'] == 'string':
+            values = values.astype(object)
+        data[col['name']] = values
+    return pd.DataFrame(data, columns=[col['name'] for col in manifest['columns']])
+
+
+def load_dataset_version(path='df_exported.csv'):
+    # (DataFrame, hash do conteúdo de onde ele veio): lê o cache colunar binário; o CSV só é processado
+    # quando o hash muda. Se o arquivo for trocado durante a leitura, lê de novo, para que dados e hash
+    # sempre correspondam
+    while True:
+        data_hash = file_hash(path)
+        target = _dataset_dir(data_hash)
+
+        try:
+            df = _read_columns(target, data_hash)
+        except (OSError, ValueError, KeyError):
+            df = None
+        if df is not None:
+            return df, data_hash
+
+        df = pd.read_csv(path)
+        if file_hash(path) != data_hash:
+            continue
+        try:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.rmtree(target, ignore_errors=True)
+            _write_columns(df, data_hash, target)
+        except OSError:
+            # Sistema de arquivos somente leitura: segue com o DataFrame do CSV
+            pass
+        return df, data_hash
+
+
+def load_dataset(path='df_exported.csv'):
+    return load_dataset_version(path)[0]
@@ -0,0 +1,216 @@
+# Ingestão incremental: aplica um arquivo de atualizações por município ao dataset, prepara os artefatos
+# derivados sob o hash da nova versão recalculando só o que depende das linhas e dos estados alterados e só
+# então troca o CSV (a versão anterior fica arquivada, com histórico). Processos que subirem depois já
+# encontram tudo pronto.
+# O arquivo de atualização tem as colunas estado e nomeLocalidade e qualquer subconjunto das demais colunas
+# do dataset; células vazias mantêm o valor atual.
+# Uso: python -m utils.delta atualizacao.csv [--dataset df_exported.csv] [--simular] [--completo] [--workers N]
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from utils.dataset_cache import cache_path, file_hash
+
+KEY_COLUMNS = ['estado', 'nomeLocalidade']
+
+# Versões substituídas do CSV (por hash) e histórico das atualizações aplicadas
+VERSIONS_DIR = cache_path('versions')
+_HISTORY = 'historico.jsonl'
+
+
+def read_delta(path):
+    delta = pd.read_csv(path)
+    ausentes = [col for col in KEY_COLUMNS if col not in delta.columns]
+    if ausentes:
+        raise ValueError(f"Arquivo de atualização sem as colunas-chave: {', '.join(ausentes)}")
+    return delta
+
+
+def apply_delta(df, delta):
+    # Devolve (novo DataFrame, posições das linhas alteradas, estados alterados, colunas alteradas);
+    # linhas e ordem do dataset não mudam, só valores
+    from utils.municipality_index import build_index
+
+    desconhecidas = [col for col in delta.columns if col not in df.columns]
+    if desconhecidas:
+        raise ValueError(f"Colunas inexistentes no dataset: {', '.join(desconhecidas)}")
+    duplicadas = delta[delta.duplicated(KEY_COLUMNS)]
+    if len(duplicadas):
+        raise ValueError(f"Municípios repetidos no arquivo de atualização: {', '.join(duplicadas['nomeLocalidade'].astype(str)[:5])}")
+
+    keys = build_index(df)['keys']
+    chaves = list(zip(delta['estado'], delta['nomeLocalidade']))
+    faltando = [f"{nome} ({estado})" for estado, nome in chaves if (estado, nome) not in keys]
+    if faltando:
+        raise ValueError(f"Municípios não encontrados no dataset: {', '.join(faltando[:5])}" + (f" e mais {len(faltando) - 5}" if len(faltando) > 5 else ''))
+    posicoes = np.array([keys[chave] for chave in chaves], dtype=np.int64)
+
+    novo = df.copy()
+    alteradas = np.zeros(len(df), dtype=bool)
+    colunas = []
+    for col in delta.columns:
+        if col in KEY_COLUMNS:
+            continue
+        valores = pd.to_numeric(delta[col], errors='raise').to_numpy(dtype=np.float64)
+        presentes = ~np.isnan(valores)
+        alvo, valores = posicoes[presentes], valores[presentes]
+
+        diferentes = df[col].to_numpy(dtype=np.float64)[alvo] != valores
+        if not diferentes.any():
+            continue
+        atual = novo[col].to_numpy(copy=True)
+        if atual.dtype.kind in 'iu' and not np.array_equal(valores, np.round(valores)):
+            atual = atual.astype(np.float64)
+        atual[alvo] = valores
+        novo[col] = atual
+        alteradas[alvo[diferentes]] = True
+        colunas.append(col)
+
+    posicoes_alteradas = np.flatnonzero(alteradas)
+    estados = sorted(set(df['estado'].to_numpy()[posicoes_alteradas].astype(str)))
+    return novo, posicoes_alteradas, estados, colunas
+
+
+def write_candidate(df, path):
+    # Grava a nova versão ao lado do CSV atual, sem substituí-lo; devolve (caminho, hash)
+    # Mesmo formato do CSV original: BOM e primeira coluna (índice exportado) sem nome
+    candidate = f"{path}.novo-{os.getpid()}"
+    df.rename(columns={'Unnamed: 0': ''}).to_csv(candidate, index=False, encoding='utf-8-sig')
+    return candidate, file_hash(candidate)
+
+
+def publish_version(candidate, path, old_hash, registro):
+    # Arquiva o CSV atual e põe a nova versão no lugar com uma troca atômica, registrando no histórico
+    if file_hash(path) != old_hash:
+        raise RuntimeError(f"{path} foi alterado durante a atualização; nada foi publicado")
+    os.makedirs(VERSIONS_DIR, exist_ok=True)
+    arquivo = os.path.join(VERSIONS_DIR, f"{old_hash[:16]}.csv")
+    if not os.path.exists(arquivo):
+        shutil.copyfile(path, arquivo)
+
+    os.replace(candidate, path)
+    atual = file_hash(path)
+
+    registro = dict(registro, data=datetime.now(timezone.utc).isoformat(), anterior=old_hash, atual=atual, arquivo_anterior=arquivo)
+    with open(os.path.join(VERSIONS_DIR, _HISTORY), 'a', encoding='utf-8') as f:
+        f.write(json.dumps(registro, ensure_ascii=False) + '\n')
+    return atual
+
+
+def history():
+    try:
+        with open(os.path.join(VERSIONS_DIR, _HISTORY), encoding='utf-8') as f:
+            return [json.loads(linha) for linha in f if linha.strip()]
+    except OSError:
+        return []
+
+
+def refresh_artifacts(path, old_hash, data_hash, posicoes, estados, colunas, compact=True, diagnosticos=True, workers=None):
+    # Artefatos do app sob o novo hash, a partir dos da versão anterior quando existirem; devolve o que foi feito
+    from models.precompute import update_predictions
+    from utils.aggregates import build_aggregates, load_cached_aggregates, store_aggregates, update_aggregates
+    from utils.compact import load_app_dataset
+    from utils.correlations import build_correlations, load_cached_correlations, store_correlations, update_correlations
+    from utils.diagnostics import carry_over as carry_over_tables
+    from utils.diagnostics import prerender_all, reusable_states
+    from utils.figures import carry_over as carry_over_figures
+    from utils.figures import warm_all
+    from utils.municipality_index import build_index
+    from utils.peers import load_or_build_peers
+    from utils.rankings import build_rankings, load_cached_rankings, store_rankings, update_rankings
+
+    # `path` é a versão candidata, ainda fora do lugar; também grava o cache colunar dela
+    df = load_app_dataset(path, compact)
+    index = build_index(df)
+    scope = 'compacto' if compact else 'completo'
+    resumo = {}
+
+    old_aggregates = load_cached_aggregates(old_hash, scope)
+    aggregates = update_aggregates(old_aggregates, df, estados) if old_aggregates else build_aggregates(df)
+    store_aggregates(aggregates, data_hash, scope)
+    resumo['agregados'] = f"{len(estados)} estados" if old_aggregates else 'completos'
+
+    old_rankings = load_cached_rankings(old_hash)
+    store_rankings(update_rankings(old_rankings, df, estados) if old_rankings else build_rankings(df), data_hash)
+    resumo['rankings'] = f"{len(estados)} estados" if old_rankings else 'completos'
+
+    # Correlações no recorte da página de detalhes (municípios até 100 mil habitantes)
+    ate100k = df[df['População residente'] <= 100000]
+    old_correlations = load_cached_correlations(old_hash, 'ate100k')
+    correlations = update_correlations(old_correlations, ate100k, estados) if old_correlations else build_correlations(ate100k)
+    store_correlations(correlations, data_hash, 'ate100k')
+    resumo['correlacoes'] = f"{len(estados)} estados" if old_correlations else 'completas'
+
+    _, recalculadas = update_predictions(df, data_hash)
+    resumo['previsoes'] = f"{recalculadas} linhas"
+
+    # A padronização dos indicadores é global: o índice de vizinhos é refeito (alguns ms)
+    load_or_build_peers(df, data_hash)
+
+    # Os gráficos só dependem do IDH: sem mudança nele, todas as figuras são reaproveitadas
+    if 'IDH' in colunas:
+        inalterados = [estado for estado in index['states'] if estado not in estados]
+    else:
+        inalterados = list(index['states'])
+    copiadas = carry_over_figures(old_hash, data_hash, inalterados, nacional='IDH' not in colunas)
+    resumo['figuras'] = f"{copiadas} reaproveitadas, {warm_all(df, index, data_hash)} geradas"
+
+    # Tabelas de diagnóstico: reaproveitadas para municípios não alterados de estados cujas médias e
+    # correlações exibidas não mudaram; as demais são renderizadas agora, fora do caminho das requisições
+    reaproveitadas = 0
+    if old_aggregates and old_correlations:
+        validos = set(reusable_states(old_aggregates, old_correlations, aggregates, correlations))
+        alteradas = set(posicoes.tolist())
+        keys = [key for pos, key in enumerate(zip(df['estado'], df['nomeLocalidade'])) if key[0] in validos and pos not in alteradas]
+        reaproveitadas = carry_over_tables(old_hash, data_hash, keys)
+    renderizadas = prerender_all(df, data_hash, aggregates, correlations, workers=workers, progress=None) if diagnosticos else 0
+    resumo['diagnosticos'] = f"{reaproveitadas} reaproveitados, {renderizadas} renderizados"
+    return resumo
+
+
+def main(argv=None):
+    from utils.dataset_cache import load_dataset_version
+
+    parser = argparse.ArgumentParser(description="Aplica atualizações por município ao dataset e prepara os artefatos da nova versão.")
+    parser.add_argument('atualizacao', help="CSV com estado, nomeLocalidade e as colunas atualizadas")
+    parser.add_argument('--dataset', default='df_exported.csv', help="CSV do dataset (padrão: df_exported.csv)")
+    parser.add_argument('--simular', action='store_true', help="só valida e mostra o que mudaria, sem gravar")
+    parser.add_argument('--completo', action='store_true', help="prepara os artefatos com os tipos do CSV (equivale a IDH_COMPACT=0 no app)")
+    parser.add_argument('--sem-diagnosticos', action='store_true', help="não renderiza as tabelas de diagnóstico que não puderem ser reaproveitadas")
+    parser.add_argument('--workers', type=int, default=None, help="processos de renderização das tabelas (padrão: número de CPUs)")
+    args = parser.parse_args(argv)
+
+    inicio = time.perf_counter()
+    atual, old_hash = load_dataset_version(args.dataset)
+    try:
+        df, posicoes, estados, colunas = apply_delta(atual, read_delta(args.atualizacao))
+    except ValueError as erro:
+        parser.error(str(erro))
+    print(f"{len(posicoes)} municípios alterados em {len(estados)} estados; colunas: {', '.join(colunas) or '-'}", file=sys.stderr)
+    if args.simular or not len(posicoes):
+        return
+
+    registro = {'delta': os.path.abspath(args.atualizacao), 'delta_hash': file_hash(args.atualizacao), 'linhas': len(posicoes), 'estados': estados, 'colunas': colunas}
+    # Artefatos primeiro, troca do CSV por último: um processo que ler o novo hash já encontra tudo pronto,
+    # e os que estão no ar continuam com a versão (e o hash) que carregaram
+    candidate, data_hash = write_candidate(df, args.dataset)
+    try:
+        resumo = refresh_artifacts(candidate, old_hash, data_hash, posicoes, estados, colunas, compact=not args.completo, diagnosticos=not args.sem_diagnosticos, workers=args.workers)
+        publish_version(candidate, args.dataset, old_hash, registro)
+    finally:
+        if os.path.exists(candidate):
+            os.remove(candidate)
+    for artefato, feito in resumo.items():
+        print(f"  {artefato}: {feito}", file=sys.stderr)
+    print(f"Versão {data_hash[:16]} (anterior {old_hash[:16]}) pronta em {time.perf_counter() - inicio:.1f}s", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
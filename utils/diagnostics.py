@@ -0,0 +1,263 @@
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from utils.dataset_cache import cache_path
+
+# Incrementar quando o HTML gerado mudar, para não reaproveitar tabelas renderizadas pela versão anterior
+RENDER_VERSION = 1
+
+# Tabelas do diagnóstico por área: título, uuid do Styler (ids estáveis no HTML) e indicadores
+DIAGNOSTIC_TABLES = [
+    ('Educação', 'educacao', ['Ativos com Alto Nível Educacional', 'Ativos com Médio Nível Educacional', 'Ativos com Baixo Nível Educacional']),
+    ('Emprego e Renda', 'renda', ['% de pobres', 'Média Salarial', 'Produtividade', 'PIB Municipal']),
+    ('Infraestrutura e Recursos de Saúde', 'saude', ['Taxa de Saneamento Básico', 'Médicos por milhares de habitantes', 'Hospitais por milhares de habitantes']),
+]
+
+# Formato de cada indicador e se um valor acima da média é ruim (diferença em vermelho)
+INDICATOR_FORMATS = {
+    'Ativos com Alto Nível Educacional': ('percentual', False),
+    'Ativos com Médio Nível Educacional': ('percentual', False),
+    'Ativos com Baixo Nível Educacional': ('percentual', False),
+    '% de pobres': ('percentual', True),
+    'Média Salarial': ('reais', False),
+    'Produtividade': ('reais', False),
+    'PIB Municipal': ('reais', False),
+    'Taxa de Saneamento Básico': ('percentual', False),
+    'Médicos por milhares de habitantes': ('taxa', False),
+    'Hospitais por milhares de habitantes': ('taxa', False),
+}
+
+_FORMATTERS = {
+    'percentual': lambda valor: f"{valor:.1f}%",
+    'reais': lambda valor: f"R$ {valor:,.2f}",
+    'taxa': lambda valor: f"{valor:.3f}",
+}
+
+_TABLE_STYLES = [
+    {'selector': 'th', 'props': [('text-align', 'center'), ('font-weight', 'bold'), ('background-color', '#f0f2f6'), ('padding', '8px')]},
+    {'selector': 'td', 'props': [('text-align', 'center'), ('padding', '8px')]}
+]
+
+
+def format_correlation(valor):
+    # Estados com poucos municípios podem não ter correlação definida
+    return '-' if valor is None or pd.isna(valor) else f"{valor:.3f}"
+
+
+def _format_difference(indicator, diff):
+    formato, acima_ruim = INDICATOR_FORMATS[indicator]
+    ruim = diff > 0 if acima_ruim else diff < 0
+    color = 'red' if ruim else 'green'
+    return f"<span style='color: {color}'>{'+'if diff > 0 else ''}{_FORMATTERS[formato](diff)}</span>"
+
+
+def render_table(uuid, indicators, mun, media_est, media_nac, corr_est, corr_nac):
+    formatar = {indicador: _FORMATTERS[INDICATOR_FORMATS[indicador][0]] for indicador in indicators}
+    data = {
+        'Indicador': indicators,
+        'Índice Local': [formatar[indicador](mun[indicador]) for indicador in indicators],
+        'Média Estadual': [formatar[indicador](media_est[indicador]) for indicador in indicators],
+        'Média Nacional': [formatar[indicador](media_nac[indicador]) for indicador in indicators],
+        'Diferença p/ Média Nacional': [_format_difference(indicador, float(mun[indicador]) - media_nac[indicador]) for indicador in indicators],
+        'Correlação c/ IDH (Estadual)': [format_correlation(corr_est.get(indicador)) for indicador in indicators],
+        'Correlação c/ IDH (Nacional)': [format_correlation(corr_nac.get(indicador)) for indicador in indicators]
+    }
+    styled_table = (pd.DataFrame(data).style
+        .set_uuid(uuid)
+        .hide(axis='index')
+        .set_properties(**{'text-align': 'center', 'padding': '8px'})
+        .set_table_styles(_TABLE_STYLES)
+    )
+    return styled_table.to_html()
+
+
+def render_tables(mun, aggregates, correlations):
+    # HTML das três tabelas de um município; depende só da linha, dos agregados e das correlações
+    estado = mun['estado']
+    media_nac = aggregates['nacional']['mean']
+    media_est = aggregates['estados'][estado]['mean']
+    corr_nac = correlations['nacional']
+    corr_est = correlations['estados'].get(estado, {})
+    return [
+        render_table(uuid, indicators, mun, media_est, media_nac, corr_est, corr_nac)
+        for _, uuid, indicators in DIAGNOSTIC_TABLES
+    ]
+
+
+# --- Cache do HTML renderizado: um SQLite por hash do dataset, chave (estado, município), HTML comprimido ---
+
+def _db_path(data_hash):
+    return cache_path('diagnostics', f"{data_hash[:16]}-v{RENDER_VERSION}.sqlite")
+
+
+def _connect(data_hash):
+    path = _db_path(data_hash)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    con = sqlite3.connect(path, timeout=5)
+    con.execute("CREATE TABLE IF NOT EXISTS tabelas (estado TEXT, nome TEXT, html BLOB, PRIMARY KEY (estado, nome)) WITHOUT ROWID")
+    return con
+
+
+def load_cached_tables(data_hash, estado, nome):
+    try:
+        con = _connect(data_hash)
+        try:
+            row = con.execute("SELECT html FROM tabelas WHERE estado = ? AND nome = ?", (estado, nome)).fetchone()
+        finally:
+            con.close()
+    except (sqlite3.Error, OSError):
+        return None
+    return None if row is None else json.loads(zlib.decompress(row[0]))
+
+
+def store_tables(data_hash, rows):
+    # rows: iterável de (estado, nome, [html, ...])
+    con = _connect(data_hash)
+    try:
+        with con:
+            con.executemany(
+                "INSERT OR REPLACE INTO tabelas VALUES (?, ?, ?)",
+                ((estado, nome, zlib.compress(json.dumps(tabelas, ensure_ascii=False).encode('utf-8'))) for estado, nome, tabelas in rows)
+            )
+    finally:
+        con.close()
+
+
+def diagnostic_tables(data_hash, mun, aggregates, correlations):
+    # HTML em cache quando existe; senão renderiza e grava (falhas de escrita não impedem a exibição)
+    estado, nome = mun['estado'], mun['nomeLocalidade']
+    tabelas = load_cached_tables(data_hash, estado, nome)
+    if tabelas is None:
+        tabelas = render_tables(mun, aggregates, correlations)
+        try:
+            store_tables(data_hash, [(estado, nome, tabelas)])
+        except (sqlite3.Error, OSError):
+            pass
+    return tabelas
+
+
+def cached_keys(data_hash):
+    con = _connect(data_hash)
+    try:
+        return set(con.execute("SELECT estado, nome FROM tabelas"))
+    finally:
+        con.close()
+
+
+def render_inputs(aggregates, correlations, estado=None):
+    # Médias e correlações (já formatadas) que entram no HTML: as nacionais, ou as de um estado
+    indicadores = [indicador for _, _, indicators in DIAGNOSTIC_TABLES for indicador in indicators]
+    if estado is None:
+        medias, corr = aggregates['nacional']['mean'], correlations['nacional']
+    else:
+        medias, corr = aggregates['estados'][estado]['mean'], correlations['estados'].get(estado, {})
+    return [(medias[indicador], format_correlation(corr.get(indicador))) for indicador in indicadores]
+
+
+def reusable_states(old_aggregates, old_correlations, aggregates, correlations):
+    # Estados cujo HTML da versão anterior continua válido para os municípios não alterados
+    if render_inputs(old_aggregates, old_correlations) != render_inputs(aggregates, correlations):
+        return []
+    return [
+        estado for estado in aggregates['estados']
+        if estado in old_aggregates['estados']
+        and render_inputs(old_aggregates, old_correlations, estado) == render_inputs(aggregates, correlations, estado)
+    ]
+
+
+def carry_over(old_hash, data_hash, keys):
+    # Copia do cache da versão anterior as tabelas das chaves (estado, município) indicadas, sem renderizar
+    keys = set(keys)
+    if not keys or not os.path.exists(_db_path(old_hash)):
+        return 0
+    con = _connect(old_hash)
+    try:
+        rows = [row for row in con.execute("SELECT estado, nome, html FROM tabelas") if (row[0], row[1]) in keys]
+    finally:
+        con.close()
+
+    con = _connect(data_hash)
+    try:
+        with con:
+            con.executemany("INSERT OR REPLACE INTO tabelas VALUES (?, ?, ?)", rows)
+    finally:
+        con.close()
+    return len(rows)
+
+
+_worker_inputs = None
+
+
+def _init_worker(df, aggregates, correlations):
+    global _worker_inputs
+    _worker_inputs = (df, aggregates, correlations)
+
+
+def _render_rows(positions):
+    df, aggregates, correlations = _worker_inputs
+    lote = []
+    for i in positions:
+        mun = df.iloc[i]
+        lote.append((mun['estado'], mun['nomeLocalidade'], render_tables(mun, aggregates, correlations)))
+    return lote
+
+
+def prerender_all(df, data_hash, aggregates, correlations, force=False, workers=None, batch_size=200, progress=sys.stderr):
+    # Renderiza todos os municípios ainda ausentes do cache; lotes distribuídos entre processos e gravados à medida que ficam prontos
+    workers = os.cpu_count() if workers is None else workers
+    existentes = set() if force else cached_keys(data_hash)
+    pendentes = [i for i, key in enumerate(zip(df['estado'], df['nomeLocalidade'])) if key not in existentes]
+    lotes = [pendentes[start:start + batch_size] for start in range(0, len(pendentes), batch_size)]
+
+    feitos = 0
+    inicio = time.perf_counter()
+
+    def gravar(lote):
+        nonlocal feitos
+        store_tables(data_hash, lote)
+        feitos += len(lote)
+        if progress is not None:
+            print(f"{feitos:,}/{len(pendentes):,} municípios | {feitos / (time.perf_counter() - inicio):,.0f}/s", file=progress, flush=True)
+
+    if workers <= 1 or len(lotes) <= 1:
+        _init_worker(df, aggregates, correlations)
+        for positions in lotes:
+            gravar(_render_rows(positions))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(df, aggregates, correlations)) as pool:
+            for lote in pool.map(_render_rows, lotes):
+                gravar(lote)
+    return len(pendentes)
+
+
+def main(argv=None):
+    from utils.aggregates import build_aggregates
+    from utils.correlations import load_or_build_correlations
+    from utils.dataset_cache import dataset_hash, load_dataset
+
+    parser = argparse.ArgumentParser(description="Pré-renderiza as tabelas de diagnóstico de todos os municípios.")
+    parser.add_argument('dataset', nargs='?', default='df_exported.csv', help="CSV do dataset (padrão: df_exported.csv)")
+    parser.add_argument('--forcar', action='store_true', help="renderiza de novo mesmo os municípios já em cache")
+    parser.add_argument('--workers', type=int, default=None, help="processos de renderização (padrão: número de CPUs; 1 = sem pool)")
+    args = parser.parse_args(argv)
+
+    inicio = time.perf_counter()
+    df = load_dataset(args.dataset)
+    data_hash = dataset_hash(args.dataset)
+    # Mesmas entradas da página de detalhes: agregados do país inteiro, correlações dos municípios até 100 mil habitantes
+    aggregates = build_aggregates(df)
+    correlations = load_or_build_correlations(df[df['População residente'] <= 100000], data_hash, scope='ate100k')
+    renderizados = prerender_all(df, data_hash, aggregates, correlations, force=args.forcar, workers=args.workers)
+    print(f"{len(df)} municípios, {renderizados} renderizados em {time.perf_counter() - inicio:.1f}s -> {_db_path(data_hash)}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+# Gráficos das páginas inicial e por estado, que só dependem do dataset: a especificação JSON de cada
+# figura é gerada uma vez e guardada por (gráfico, estado, hash do dataset, versão do plotly).
+# Uso: python -m utils.figures [csv]   # gera todas as figuras (página inicial e todos os estados)
+import os
+import shutil
+import sys
+import time
+from importlib.metadata import version
+
+from utils.dataset_cache import cache_path
+
+# Incrementar quando a aparência de algum gráfico mudar, para não reaproveitar figuras antigas
+FIGURES_VERSION = 1
+
+FAIXA_CORES = {
+    'IDH Muito Alto': '#1a9850',
+    'IDH Alto': '#91cf60',
+    'IDH Médio': '#fc8d59',
+    'IDH Baixo': '#d73027'
+}
+
+
+def idh_por_estado(df):
+    import plotly.express as px
+
+    # Gráfico de IDH por Estado (ordenado do menor para o maior)
+    df_estado = df.groupby('estado', observed=True)['IDH'].mean().sort_values().reset_index()
+    fig_estado = px.bar(df_estado,
+                        x='estado',
+                        y='IDH',
+                        color='IDH',
+                        color_continuous_scale='RdYlBu')
+
+    fig_estado.update_layout(
+        xaxis_title="Estado",
+        yaxis_title="IDH Médio",
+        showlegend=False
+    )
+    return fig_estado
+
+
+def distribuicao_idh(df_estado):
+    import pandas as pd
+    import plotly.express as px
+
+    # Contagem pelos códigos da categoria; só as faixas presentes no estado entram no gráfico
+    contagem = df_estado['classificacao_idh'].value_counts()
+    contagem = contagem[contagem > 0]
+    df_contagem = pd.DataFrame({'Faixa': contagem.index.astype(str), 'Quantidade': contagem.to_numpy()})
+
+    fig_dist = px.bar(df_contagem,
+                      x='Faixa',
+                      y='Quantidade',
+                      title='Distribuição dos Municípios por Faixa de IDH',
+                      color='Faixa',
+                      color_discrete_map=FAIXA_CORES)
+
+    fig_dist.update_layout(
+        showlegend=False,
+        xaxis_title="Faixa",
+        yaxis_title="Quantidade de Municípios"
+    )
+    return fig_dist
+
+
+# Gráfico -> (função que monta a figura, se recebe as linhas de um estado em vez do país inteiro)
+CHARTS = {
+    'idh_por_estado': (idh_por_estado, False),
+    'distribuicao_idh': (distribuicao_idh, True),
+}
+
+
+def _figure_path(data_hash, chart, estado=None):
+    pasta = cache_path('figures', f"{data_hash[:16]}-plotly{version('plotly')}-v{FIGURES_VERSION}")
+    return os.path.join(pasta, f"{chart}.json" if estado is None else f"{chart}-{estado}.json")
+
+
+def figure_spec(data_hash, chart, rows, estado=None):
+    # JSON da figura: do disco quando existe; senão monta a partir de `rows` e grava
+    path = _figure_path(data_hash, chart, estado)
+    try:
+        with open(path, encoding='utf-8') as f:
+            return f.read()
+    except OSError:
+        pass
+
+    builder, _ = CHARTS[chart]
+    spec = builder(rows).to_json()
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.tmp-{os.getpid()}"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(spec)
+        os.replace(tmp, path)
+    except OSError:
+        pass
+    return spec
+
+
+def warm_all(df, index, data_hash):
+    # Gera as figuras ainda ausentes de todos os gráficos e estados; devolve quantas foram montadas
+    from utils.municipality_index import state_rows
+
+    montadas = 0
+    for chart, (_, por_estado) in CHARTS.items():
+        for estado in (index['states'] if por_estado else [None]):
+            if not os.path.exists(_figure_path(data_hash, chart, estado)):
+                figure_spec(data_hash, chart, state_rows(df, index, estado) if por_estado else df, estado)
+                montadas += 1
+    return montadas
+
+
+def carry_over(old_hash, data_hash, estados, nacional=False):
+    # Copia da versão anterior as figuras que não mudaram: as por estado dos `estados` indicados e,
+    # com `nacional`, também as do país inteiro; devolve quantas foram copiadas
+    copiadas = 0
+    for chart, (_, por_estado) in CHARTS.items():
+        for estado in (estados if por_estado else ([None] if nacional else [])):
+            origem = _figure_path(old_hash, chart, estado)
+            if os.path.exists(origem):
+                destino = _figure_path(data_hash, chart, estado)
+                os.makedirs(os.path.dirname(destino), exist_ok=True)
+                shutil.copyfile(origem, destino)
+                copiadas += 1
+    return copiadas
+
+
+def main(argv=None):
+    from utils.compact import load_app_dataset
+    from utils.dataset_cache import dataset_hash
+    from utils.municipality_index import build_index
+
+    argv = sys.argv[1:] if argv is None else argv
+    path = argv[0] if argv else 'df_exported.csv'
+    inicio = time.perf_counter()
+    df = load_app_dataset(path)
+    montadas = warm_all(df, build_index(df), dataset_hash(path))
+    print(f"{montadas} figuras geradas em {time.perf_counter() - inicio:.2f}s", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
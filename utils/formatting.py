@@ -0,0 +1,35 @@
+import pandas as pd
+
+# Troca separadores do formato en-US para pt-BR em uma única tradução (1,234.56 -> 1.234,56)
+_PT_BR = str.maketrans({',': '.', '.': ','})
+
+# Formatos das colunas das tabelas de ranking
+RANKING_FORMATS = {
+    'IDH': {'decimals': 3, 'thousands': False},
+    'População residente': {'decimals': 0},
+    '% de pobres': {'decimals': 1, 'suffix': '%', 'thousands': False},
+    'Produtividade': {'decimals': 2, 'prefix': 'R$ '},
+    'PIB Municipal': {'decimals': 2, 'prefix': 'R$ '},
+}
+
+
+def format_number(value, decimals=2, prefix='', suffix='', thousands=True):
+    spec = f"{{:{',' if thousands else ''}.{decimals}f}}"
+    return prefix + spec.format(value).translate(_PT_BR) + suffix
+
+
+def format_values(values, decimals=2, prefix='', suffix='', thousands=True):
+    # Uma passada por coluna, sem Series intermediárias de string
+    spec = f"{{:{',' if thousands else ''}.{decimals}f}}"
+    return [prefix + spec.format(v).translate(_PT_BR) + suffix for v in values]
+
+
+def format_table(df, formats=RANKING_FORMATS):
+    # Formata só as linhas recebidas (a página exibida), devolvendo um novo DataFrame
+    formatted = {}
+    for col in df.columns:
+        if col in formats:
+            formatted[col] = format_values(df[col].to_numpy(), **formats[col])
+        else:
+            formatted[col] = df[col].to_numpy()
+    return pd.DataFrame(formatted, index=df.index)
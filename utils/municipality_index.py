@@ -0,0 +1,47 @@
+import numpy as np
+
+
+def _positions_to_selector(positions):
+    # Estados contíguos viram um slice, o que permite fatiar sem copiar
+    if len(positions) and positions[-1] - positions[0] + 1 == len(positions):
+        return slice(int(positions[0]), int(positions[-1]) + 1)
+    return positions
+
+
+def build_index(df):
+    # Chave única (estado, nomeLocalidade) -> posição da linha; chaves repetidas são um erro nos dados
+    keys = {}
+    repetidas = []
+    for pos, key in enumerate(zip(df['estado'], df['nomeLocalidade'])):
+        if key in keys:
+            repetidas.append(key)
+        keys[key] = pos
+    if repetidas:
+        nomes = [f"{nome} ({estado})" for estado, nome in dict.fromkeys(repetidas)]
+        raise ValueError(f"Municípios repetidos no dataset: {', '.join(nomes[:5])}" + (f" e mais {len(nomes) - 5}" if len(nomes) > 5 else ''))
+
+    estados = df['estado'].to_numpy()
+    states = {}
+    for estado in sorted(set(estados)):
+        states[estado] = _positions_to_selector(np.flatnonzero(estados == estado))
+
+    return {'keys': keys, 'states': states}
+
+
+def row_position(index, estado, municipio):
+    return index['keys'][(estado, municipio)]
+
+
+def lookup_row(df, index, estado, municipio):
+    return df.iloc[row_position(index, estado, municipio)]
+
+
+def state_positions(index, estado):
+    selector = index['states'][estado]
+    if isinstance(selector, slice):
+        return np.arange(selector.start, selector.stop)
+    return selector
+
+
+def state_rows(df, index, estado):
+    return df.iloc[index['states'][estado]]
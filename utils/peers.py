@@ -0,0 +1,78 @@
+import os
+import pickle
+
+import numpy as np
+
+from utils.dataset_cache import cache_path
+
+# Incrementar quando os indicadores ou a padronização mudarem, para não reaproveitar um índice antigo
+INDEX_VERSION = 1
+
+# Indicadores socioeconômicos usados na semelhança (o IDH fica de fora: é o que se quer comparar)
+PEER_INDICATORS = [
+    'População residente',
+    'Taxa de Urbanização',
+    'Taxa de Saneamento Básico',
+    'Ativos com Alto Nível Educacional',
+    'Ativos com Baixo Nível Educacional',
+    '% de pobres',
+    'Média Salarial',
+    'Produtividade',
+    'PIB Municipal',
+    'Médicos por milhares de habitantes',
+    'Hospitais por milhares de habitantes',
+]
+
+# Indicadores muito assimétricos entram em log, para que poucos municípios grandes não dominem a distância
+LOG_INDICATORS = ['População residente', 'Produtividade', 'PIB Municipal']
+
+
+def standardize(df):
+    values = df[PEER_INDICATORS].to_numpy(dtype=np.float64, copy=True)
+    for i, col in enumerate(PEER_INDICATORS):
+        if col in LOG_INDICATORS:
+            values[:, i] = np.log1p(np.clip(values[:, i], 0, None))
+    mean = values.mean(axis=0)
+    scale = values.std(axis=0)
+    scale[scale == 0] = 1.0
+    return (values - mean) / scale
+
+
+def build_peers(df):
+    # KD-tree sobre os indicadores padronizados; posições de linha do df são os ids dos pontos
+    from sklearn.neighbors import KDTree
+
+    return {'tree': KDTree(standardize(df), leaf_size=20), 'n': len(df)}
+
+
+def load_or_build_peers(df, data_hash):
+    # Índice persistido por hash do dataset: só é reconstruído quando os dados mudam
+    path = cache_path('peers', f"{data_hash[:16]}-v{INDEX_VERSION}.pkl")
+    try:
+        with open(path, 'rb') as f:
+            peers = pickle.load(f)
+        if peers['n'] == len(df):
+            return peers
+    except (OSError, pickle.UnpicklingError, EOFError, KeyError):
+        pass
+
+    peers = build_peers(df)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.tmp-{os.getpid()}"
+        with open(tmp, 'wb') as f:
+            pickle.dump(peers, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+    except OSError:
+        pass
+    return peers
+
+
+def nearest_peers(peers, position, k=5):
+    # Os k municípios mais próximos da linha `position` (ela própria excluída): (posições, distâncias)
+    tree = peers['tree']
+    ponto = np.asarray(tree.data[position:position + 1])
+    distances, positions = tree.query(ponto, k=min(k + 1, peers['n']))
+    distances, positions = distances[0], positions[0]
+    outros = positions != position
+    return positions[outros][:k], distances[outros][:k]
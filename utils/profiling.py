@@ -0,0 +1,108 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from functools import wraps
+
+import numpy as np
+
+# Quantidade de medições mantidas por span (janela móvel)
+WINDOW = 1000
+
+logger = logging.getLogger('idh_expert.profiling')
+
+_spans = defaultdict(lambda: deque(maxlen=WINDOW))
+_lock = threading.Lock()
+_last_log = [0.0]
+
+
+def record(name, ms):
+    with _lock:
+        _spans[name].append(ms)
+
+
+@contextmanager
+def span(name):
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, (time.perf_counter() - inicio) * 1000)
+
+
+def timed(name=None):
+    # Decorador: mede cada chamada da função como um span
+    def decorar(func):
+        nome = name or f"{func.__module__}.{func.__name__}"
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            inicio = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record(nome, (time.perf_counter() - inicio) * 1000)
+        return wrapper
+    return decorar
+
+
+class SectionTimer:
+    # Mede seções sequenciais de um script: cada mark() registra o tempo desde a marca anterior
+
+    def __init__(self, prefix):
+        self.prefix = prefix
+        self._last = time.perf_counter()
+
+    def mark(self, name):
+        agora = time.perf_counter()
+        record(f"{self.prefix}.{name}", (agora - self._last) * 1000)
+        self._last = agora
+
+
+def percentiles():
+    # p50/p95/p99 da janela móvel de cada span, em ms
+    with _lock:
+        amostras = {nome: np.fromiter(valores, dtype=np.float64) for nome, valores in _spans.items() if valores}
+    resumo = {}
+    for nome, valores in sorted(amostras.items()):
+        p50, p95, p99 = np.percentile(valores, [50, 95, 99])
+        resumo[nome] = {
+            'n': len(valores),
+            'p50_ms': float(p50),
+            'p95_ms': float(p95),
+            'p99_ms': float(p99),
+            'max_ms': float(valores.max()),
+        }
+    return resumo
+
+
+def export_metrics():
+    return json.dumps({'timestamp': time.time(), 'pid': os.getpid(), 'spans': percentiles()}, ensure_ascii=False)
+
+
+def configure_logging(destino='-'):
+    # Uma linha JSON por exportação, em stderr ('-') ou em um arquivo; idempotente
+    if not logger.handlers:
+        handler = logging.StreamHandler() if destino == '-' else logging.FileHandler(destino, encoding='utf-8')
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+
+
+def maybe_log_metrics(interval=60.0):
+    # Registra as métricas como JSON no log, no máximo uma vez por intervalo (por processo)
+    agora = time.time()
+    with _lock:
+        if agora - _last_log[0] < interval:
+            return
+        _last_log[0] = agora
+    logger.info(export_metrics())
+
+
+def reset():
+    with _lock:
+        _spans.clear()
@@ -0,0 +1,104 @@
+import os
+
+import numpy as np
+
+from utils.dataset_cache import cache_path
+
+# Rótulo exibido -> coluna usada na ordenação
+SORT_KEYS = {
+    'IDH': 'IDH',
+    'População': 'População residente',
+    '% de pobres': '% de pobres',
+    'Produtividade': 'Produtividade',
+    'PIB Municipal': 'PIB Municipal',
+}
+
+
+def build_rankings(df, columns=SORT_KEYS.values()):
+    # Posições de linha em ordem decrescente, nacional e por estado, para cada coluna.
+    # Estrutura: {'nacional': {coluna: posições}, 'estados': {estado: {coluna: posições}}}
+    estados, codes = np.unique(df['estado'].to_numpy().astype(str), return_inverse=True)
+    rankings = {'nacional': {}, 'estados': {estado: {} for estado in estados}}
+
+    for col in columns:
+        valores = df[col].to_numpy(dtype=np.float64)
+        rankings['nacional'][col] = np.argsort(-valores, kind='stable')
+
+        # Uma ordenação só: estado como chave primária, valor decrescente como secundária
+        ordem = np.lexsort((-valores, codes))
+        limites = np.searchsorted(codes[ordem], np.arange(len(estados) + 1))
+        for i, estado in enumerate(estados):
+            rankings['estados'][estado][col] = ordem[limites[i]:limites[i + 1]]
+
+    return rankings
+
+
+def update_rankings(previous, df, estados, columns=SORT_KEYS.values()):
+    # Após uma atualização parcial (mesmas linhas, na mesma ordem): nacional reordenado, estaduais só dos
+    # estados alterados; a ordem estável dentro de cada estado é a mesma de build_rankings
+    nomes = df['estado'].to_numpy().astype(str)
+    rankings = {'nacional': {}, 'estados': {estado: dict(colunas) for estado, colunas in previous['estados'].items()}}
+    for col in columns:
+        valores = df[col].to_numpy(dtype=np.float64)
+        rankings['nacional'][col] = np.argsort(-valores, kind='stable')
+        for estado in estados:
+            posicoes = np.flatnonzero(nomes == estado)
+            rankings['estados'][estado][col] = posicoes[np.argsort(-valores[posicoes], kind='stable')]
+    return rankings
+
+
+def _rankings_path(data_hash):
+    return cache_path('rankings', f"{data_hash[:16]}.npz")
+
+
+def store_rankings(rankings, data_hash):
+    # Um array por (escopo, coluna); o separador "|" não aparece em nomes de estado nem de coluna
+    arrays = {f"nacional|{col}": posicoes for col, posicoes in rankings['nacional'].items()}
+    for estado, colunas in rankings['estados'].items():
+        arrays.update({f"estado|{estado}|{col}": posicoes for col, posicoes in colunas.items()})
+    path = _rankings_path(data_hash)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.tmp-{os.getpid()}.npz"
+        np.savez(tmp, **arrays)
+        os.replace(tmp, path)
+    except OSError:
+        pass
+
+
+def load_cached_rankings(data_hash):
+    try:
+        with np.load(_rankings_path(data_hash), allow_pickle=False) as data:
+            arrays = {name: data[name] for name in data.files}
+    except (OSError, ValueError):
+        return None
+    rankings = {'nacional': {}, 'estados': {}}
+    for name, posicoes in arrays.items():
+        partes = name.split('|')
+        if partes[0] == 'nacional':
+            rankings['nacional'][partes[1]] = posicoes
+        else:
+            rankings['estados'].setdefault(partes[1], {})[partes[2]] = posicoes
+    return rankings
+
+
+def load_or_build_rankings(df, data_hash):
+    rankings = load_cached_rankings(data_hash)
+    if rankings is None:
+        rankings = build_rankings(df)
+        store_rankings(rankings, data_hash)
+    return rankings
+
+
+def ranking_positions(rankings, column, estado=None):
+    if estado is None:
+        return rankings['nacional'][column]
+    return rankings['estados'][estado][column]
+
+
+def page_positions(positions, pagina, items_por_pagina, ascending=False):
+    # Fatia direta (view) do array pré-ordenado; ordem crescente percorre o array ao contrário
+    if ascending:
+        positions = positions[::-1]
+    inicio = pagina * items_por_pagina
+    return positions[inicio:inicio + items_por_pagina]
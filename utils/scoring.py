@@ -0,0 +1,51 @@
+import numpy as np
+
+# Pesos padrão do score de potencial de investimento
+PESOS_PADRAO = {'idh': 0.5, 'pobres': 0.3, 'populacao': 0.2}
+
+
+def normalize_weights(pesos):
+    total = sum(pesos.values())
+    if total <= 0:
+        return dict(PESOS_PADRAO)
+    return {nome: valor / total for nome, valor in pesos.items()}
+
+
+def build_score_inputs(df):
+    # Arrays do país inteiro, calculados uma vez: a população máxima por estado já vem alinhada às linhas
+    populacao = df['População residente'].to_numpy(dtype=np.float64)
+    return {
+        'idh': df['IDH'].to_numpy(dtype=np.float64),
+        'pobres': df['% de pobres'].to_numpy(dtype=np.float64),
+        'populacao': populacao,
+        'pop_max_estado': df.groupby('estado', observed=True)['População residente'].transform('max').to_numpy(dtype=np.float64),
+        'pop_max_nacional': float(populacao.max()),
+    }
+
+
+def investment_scores(inputs, pesos=PESOS_PADRAO, escopo='estado'):
+    # Score de todos os municípios em uma passada; escopo define a população de referência
+    pesos = normalize_weights(pesos)
+    pop_max = inputs['pop_max_estado'] if escopo == 'estado' else inputs['pop_max_nacional']
+    return (
+        (1 - inputs['idh']) * pesos['idh']
+        + (1 - inputs['pobres'] / 100) * pesos['pobres']
+        + (1 - inputs['populacao'] / pop_max) * pesos['populacao']
+    )
+
+
+def top_k(scores, k, positions=None):
+    # Seleção parcial (argpartition) em vez de ordenar tudo; empates ficam na ordem original,
+    # como no DataFrame.nlargest. Retorna posições de linha do DataFrame.
+    if positions is None:
+        positions = np.arange(len(scores))
+    else:
+        scores = scores[positions]
+    k = min(k, len(scores))
+    if k == 0:
+        return positions[:0]
+
+    limiar = scores[np.argpartition(-scores, k - 1)[:k]].min()
+    candidatos = np.flatnonzero(scores >= limiar)
+    ordem = candidatos[np.lexsort((candidatos, -scores[candidatos]))][:k]
+    return positions[ordem]
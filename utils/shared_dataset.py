@@ -0,0 +1,259 @@
+# Segmento compartilhado entre processos do app: colunas do dataset, agregados, rankings, previsões,
+# árvores do modelo e do conjunto de boosters gravados uma vez como arquivos .npy em um diretório de memória (/dev/shm).
+# Cada worker mapeia os arquivos (mmap somente leitura): as páginas ficam no page cache uma única vez,
+# qualquer que seja o número de réplicas.
+# Uso: python -m utils.shared_dataset [csv] --dir /dev/shm/idh-expert [--completo]
+import argparse
+import json
+import os
+import re
+import shutil
+import sys
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_DIR = '/dev/shm/idh-expert'
+
+# Incrementar quando o formato do segmento mudar, para que os workers não mapeiem um segmento antigo
+SEGMENT_VERSION = 4
+
+_MANIFEST = 'manifest.json'
+
+# Nome dos diretórios criados por segment_dir: hash dos dados, hash do modelo, variante e versão do formato
+_SEGMENT_NAME = re.compile(r'^[0-9a-f]{16}-[0-9a-f]{16}-(compacto|completo)-v(\d+)$')
+
+FOREST_ARRAYS = ['feature', 'threshold', 'left', 'right', 'default_left', 'leaf_value', 'roots']
+FOREST_SCALARS = ['max_depth', 'base_score', 'num_feature']
+ENSEMBLE_ARRAYS = ['feature', 'threshold', 'left', 'right', 'default_left', 'leaf_value', 'roots', 'members', 'base_scores']
+ENSEMBLE_SCALARS = ['max_depth', 'num_feature']
+
+
+def segment_dir(base_dir, data_hash, model_hash, compact=True):
+    return os.path.join(base_dir, f"{data_hash[:16]}-{model_hash[:16]}-{'compacto' if compact else 'completo'}-v{SEGMENT_VERSION}")
+
+
+def _save(tmp, name, values):
+    np.save(os.path.join(tmp, name), np.ascontiguousarray(values), allow_pickle=False)
+    return name
+
+
+def _write_segment(tmp, data_hash, df, aggregates, rankings, predictions, forest, scaler, ensemble=None):
+    manifest = {'data_hash': data_hash, 'rows': len(df), 'columns': [], 'rankings': {}, 'predictions': [], 'forest': {}}
+
+    # Colunas: numéricas como estão; texto e categorias como códigos + categorias (única forma sem cópia)
+    for i, name in enumerate(df.columns):
+        serie = df[name]
+        if isinstance(serie.dtype, pd.CategoricalDtype) or serie.dtype.kind not in 'biuf':
+            categorical = serie.astype('category').array
+            arquivo = _save(tmp, f"col_{i:03d}.npy", categorical.codes)
+            manifest['columns'].append({'name': name, 'file': arquivo, 'categories': [str(c) for c in categorical.categories], 'ordered': bool(categorical.ordered)})
+        else:
+            arquivo = _save(tmp, f"col_{i:03d}.npy", serie.to_numpy())
+            manifest['columns'].append({'name': name, 'file': arquivo})
+
+    with open(os.path.join(tmp, 'aggregates.json'), 'w', encoding='utf-8') as f:
+        json.dump(aggregates, f, ensure_ascii=False)
+
+    # Rankings: por coluna, o nacional e a concatenação dos estaduais com os limites de cada estado
+    estados = list(rankings['estados'])
+    for i, col in enumerate(rankings['nacional']):
+        partes = [rankings['estados'][estado][col] for estado in estados]
+        manifest['rankings'][col] = {
+            'nacional': _save(tmp, f"rank_{i:02d}_nacional.npy", rankings['nacional'][col]),
+            'estados': _save(tmp, f"rank_{i:02d}_estados.npy", np.concatenate(partes)),
+            'limites': np.cumsum([0] + [len(p) for p in partes]).tolist(),
+        }
+    manifest['estados'] = estados
+
+    for i, name in enumerate(predictions.columns):
+        manifest['predictions'].append({'name': name, 'file': _save(tmp, f"pred_{i:02d}.npy", predictions[name].to_numpy())})
+
+    for key in FOREST_ARRAYS:
+        manifest['forest'][key] = _save(tmp, f"forest_{key}.npy", forest[key])
+    for key in FOREST_SCALARS:
+        manifest['forest'][key] = float(forest[key]) if key == 'base_score' else int(forest[key])
+
+    # Modelo principal e boosters quantílicos empilhados (opcional: ausente se os quantis não forem deste modelo)
+    if ensemble is not None:
+        manifest['ensemble'] = {key: _save(tmp, f"ensemble_{key}.npy", ensemble[key]) for key in ENSEMBLE_ARRAYS}
+        manifest['ensemble'].update({key: int(ensemble[key]) for key in ENSEMBLE_SCALARS})
+
+    manifest['scaler'] = {
+        'with_mean': bool(scaler.with_mean),
+        'with_std': bool(scaler.with_std),
+        'mean_': _save(tmp, 'scaler_mean.npy', np.asarray(scaler.mean_, dtype=np.float64)),
+        'scale_': _save(tmp, 'scaler_scale.npy', np.asarray(scaler.scale_, dtype=np.float64)),
+    }
+
+    with open(os.path.join(tmp, _MANIFEST), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False)
+
+
+def publish(target, data_hash, df, aggregates, rankings, predictions, forest, scaler, ensemble=None):
+    # Grava em um diretório temporário e troca de forma atômica; quem já mapeou uma versão anterior
+    # continua com ela até reiniciar (os arquivos removidos só são liberados quando ninguém os usa)
+    tmp = f"{target}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    _write_segment(tmp, data_hash, df, aggregates, rankings, predictions, forest, scaler, ensemble)
+    try:
+        os.rename(tmp, target)
+    except OSError:
+        # Outro processo publicou primeiro: vale o dele
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    remove_superseded(target)
+
+
+def remove_superseded(target):
+    # Remove só os segmentos que `target` substitui: mesma variante (compacto/completo), com formato anterior
+    # ou publicados antes dele (outra versão dos dados ou do modelo). Diretórios com outro nome, temporários
+    # de publicações em andamento e segmentos mais novos ficam; devolve os removidos
+    atual = _SEGMENT_NAME.match(os.path.basename(target))
+    if atual is None or not os.path.isdir(target):
+        return []
+    base_dir = os.path.dirname(target)
+    publicado = os.path.getmtime(target)
+
+    removidos = []
+    for nome in os.listdir(base_dir):
+        encontrado = _SEGMENT_NAME.match(nome)
+        caminho = os.path.join(base_dir, nome)
+        if encontrado is None or caminho == target or encontrado.group(1) != atual.group(1):
+            continue
+        versao = int(encontrado.group(2))
+        try:
+            anterior = versao < SEGMENT_VERSION or (versao == SEGMENT_VERSION and os.path.getmtime(caminho) < publicado)
+        except OSError:
+            continue
+        if anterior:
+            shutil.rmtree(caminho, ignore_errors=True)
+            removidos.append(caminho)
+    return removidos
+
+
+def attach(target):
+    # Mapeia um segmento publicado; None se ele não existir
+    manifest_path = os.path.join(target, _MANIFEST)
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path, encoding='utf-8') as f:
+        manifest = json.load(f)
+
+    def load(arquivo):
+        return np.load(os.path.join(target, arquivo), mmap_mode='r', allow_pickle=False)
+
+    colunas = {}
+    for col in manifest['columns']:
+        values = load(col['file'])
+        if 'categories' in col:
+            values = pd.Categorical.from_codes(values, categories=col['categories'], ordered=col['ordered'], validate=False)
+        colunas[col['name']] = values
+    df = pd.DataFrame(colunas, columns=[col['name'] for col in manifest['columns']], copy=False)
+
+    with open(os.path.join(target, 'aggregates.json'), encoding='utf-8') as f:
+        aggregates = json.load(f)
+
+    rankings = {'nacional': {}, 'estados': {estado: {} for estado in manifest['estados']}}
+    for col, spec in manifest['rankings'].items():
+        rankings['nacional'][col] = load(spec['nacional'])
+        concatenado = load(spec['estados'])
+        for i, estado in enumerate(manifest['estados']):
+            rankings['estados'][estado][col] = concatenado[spec['limites'][i]:spec['limites'][i + 1]]
+
+    predictions = pd.DataFrame({p['name']: load(p['file']) for p in manifest['predictions']}, copy=False)
+
+    forest = {key: load(arquivo) for key, arquivo in manifest['forest'].items() if key in FOREST_ARRAYS}
+    forest.update({key: manifest['forest'][key] for key in FOREST_SCALARS})
+
+    ensemble = None
+    if 'ensemble' in manifest:
+        ensemble = {key: load(manifest['ensemble'][key]) for key in ENSEMBLE_ARRAYS}
+        ensemble.update({key: manifest['ensemble'][key] for key in ENSEMBLE_SCALARS})
+
+    scaler = SimpleNamespace(
+        with_mean=manifest['scaler']['with_mean'],
+        with_std=manifest['scaler']['with_std'],
+        mean_=load(manifest['scaler']['mean_']),
+        scale_=load(manifest['scaler']['scale_']),
+    )
+    return {'data_hash': manifest['data_hash'], 'df': df, 'aggregates': aggregates, 'rankings': rankings, 'predictions': predictions, 'forest': forest, 'scaler': scaler, 'ensemble': ensemble}
+
+
+def build_segment(path='df_exported.csv', compact=True):
+    # Tudo o que os workers compartilham, calculado do mesmo jeito que o app faria localmente
+    from models.ensemble import load_ensemble
+    from models.precompute import load_predictions
+    from models.xgb_model import load_fast_model, load_scaler
+    from utils.aggregates import load_or_build_aggregates
+    from utils.compact import load_app_dataset_version
+    from utils.rankings import load_or_build_rankings
+
+    # O hash vem junto com os dados: o segmento nunca mistura um CSV trocado no meio da leitura
+    df, data_hash = load_app_dataset_version(path, compact)
+    forest = load_fast_model()
+    return {
+        'data_hash': data_hash,
+        'df': df,
+        'aggregates': load_or_build_aggregates(df, data_hash, 'compacto' if compact else 'completo'),
+        'rankings': load_or_build_rankings(df, data_hash),
+        'predictions': load_predictions(df, data_hash),
+        'forest': forest,
+        'scaler': load_scaler(),
+        'ensemble': load_ensemble(forest),
+    }
+
+
+def attach_or_publish(base_dir, path='df_exported.csv', compact=True):
+    # O primeiro processo a subir publica o segmento; os demais (e os próximos) só mapeiam
+    from models.precompute import model_hash
+    from utils.dataset_cache import dataset_hash
+
+    try:
+        shared = attach(segment_dir(base_dir, dataset_hash(path), model_hash(), compact))
+    except FileNotFoundError:
+        # Segmento removido durante a leitura (uma versão mais nova foi publicada): usa o da versão atual
+        shared = None
+    if shared is None:
+        shared = attach(publish_current(base_dir, path, compact))
+    return shared
+
+
+def publish_current(base_dir, path='df_exported.csv', compact=True):
+    # Publica o segmento da versão atual do CSV (no diretório do hash efetivamente lido); devolve o diretório
+    from models.precompute import model_hash
+
+    segmento = build_segment(path, compact)
+    target = segment_dir(base_dir, segmento['data_hash'], model_hash(), compact)
+    os.makedirs(base_dir, exist_ok=True)
+    publish(target, **segmento)
+    return target
+
+
+def segment_size(target):
+    return sum(os.path.getsize(os.path.join(target, nome)) for nome in os.listdir(target))
+
+
+def main(argv=None):
+    from models.precompute import model_hash
+    from utils.dataset_cache import dataset_hash
+
+    parser = argparse.ArgumentParser(description="Publica o dataset, os agregados e o modelo em memória compartilhada para os workers do app.")
+    parser.add_argument('dataset', nargs='?', default='df_exported.csv', help="CSV do dataset (padrão: df_exported.csv)")
+    parser.add_argument('--dir', default=DEFAULT_DIR, help=f"diretório em memória (padrão: {DEFAULT_DIR}); use o mesmo valor em IDH_SHARED_DIR")
+    parser.add_argument('--completo', action='store_true', help="publica com os tipos do CSV (equivale a IDH_COMPACT=0 nos workers)")
+    args = parser.parse_args(argv)
+
+    inicio = time.perf_counter()
+    compact = not args.completo
+    target = segment_dir(args.dir, dataset_hash(args.dataset), model_hash(), compact)
+    if not os.path.exists(os.path.join(target, _MANIFEST)):
+        target = publish_current(args.dir, args.dataset, compact)
+    print(f"Segmento {target}: {segment_size(target) / 1e6:.2f} MB em {time.perf_counter() - inicio:.2f}s", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()